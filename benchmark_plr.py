@@ -0,0 +1,204 @@
+# benchmark_plr.py – benchmark reprodutível das etapas da apuração
+# Gera bases sintéticas (semente fixa) com as colunas de REQUIRED_COLS e datas concentradas
+# em torno das fronteiras das regras (31/12/2024, 02/08/2025 e a data de assinatura),
+# mede tempo de parede e pico de memória de cada etapa e grava o resultado em JSON.
+#
+# Exemplos:
+#   python benchmark_plr.py                              # 10k, 100k e 1M linhas, todas as etapas
+#   python benchmark_plr.py --tamanhos 10000 100000 --saida bench.json
+#   python benchmark_plr.py --etapas elegibilidade tetos --sem-memoria
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from plr_engine import (
+    MONEY_COLS,
+    ensure_required_columns, compactar_base, indexar_por_matricula, calcular_proporcionalidade_especial,
+    aplicar_elegibilidade, aplicar_tetos, finalizar_resultado, calcular_antecipacao, calcular_cubo, com_motivo_texto, fmt_brl, paginar,
+)
+from plr_io import planilhas_resultado, to_excel_bytes
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+DATA_ASSINATURA = "2025-09-01"
+LUCRO = 500_000_000.0
+
+# =========================
+# Base sintética
+# =========================
+def _datas_perto(rng, ancoras, n, espalhamento_dias):
+    """Datas sorteadas em torno de âncoras (dia a dia, inclusive os dias 14/15/16 do mês)."""
+    ancora = pd.to_datetime(rng.choice(ancoras, n)).to_numpy()
+    deslocamento = rng.integers(-espalhamento_dias, espalhamento_dias + 1, n).astype("timedelta64[D]")
+    return ancora + deslocamento
+
+def gerar_base_sintetica(n: int, semente: int = 42, data_assinatura=DATA_ASSINATURA) -> pd.DataFrame:
+    """
+    Base com n colaboradores, como viria de um CSV/Excel de RH (datas em texto).
+    Admissões: ~70% antigas (antes de 2025), ~10% perto de 31/12/2024, ~20% ao longo de 2025.
+    Desligamentos: ~75% ativos; os demais antes de 02/08/2025, entre 02/08 e a assinatura, ou depois dela.
+    """
+    rng = np.random.default_rng(semente)
+    assinatura = pd.Timestamp(data_assinatura)
+
+    grupo_adm = rng.choice(3, n, p=[0.70, 0.10, 0.20])
+    antigas = pd.Timestamp("2005-01-01").to_datetime64() + rng.integers(0, 7000, n).astype("timedelta64[D]")
+    fronteira = _datas_perto(rng, ["2024-12-31"], n, 20)
+    em_2025 = pd.Timestamp("2025-01-01").to_datetime64() + rng.integers(0, 365, n).astype("timedelta64[D]")
+    admissao = np.where(grupo_adm == 0, antigas, np.where(grupo_adm == 1, fronteira, em_2025))
+
+    grupo_desl = rng.choice(4, n, p=[0.75, 0.10, 0.10, 0.05])
+    antes = pd.Timestamp("2025-01-15").to_datetime64() + rng.integers(0, 199, n).astype("timedelta64[D]")
+    janela = _datas_perto(rng, ["2025-08-02", str(assinatura.date())], n, 10)
+    depois = assinatura.to_datetime64() + rng.integers(1, 90, n).astype("timedelta64[D]")
+    desligamento = np.where(grupo_desl == 1, antes, np.where(grupo_desl == 2, janela, depois))
+    desligamento = np.where(grupo_desl == 0, np.datetime64("NaT"), desligamento)
+    desligamento = np.where(desligamento < admissao, np.datetime64("NaT"), desligamento)
+
+    adm_txt = pd.Series(admissao).dt.strftime("%Y-%m-%d")
+    desl_txt = pd.Series(desligamento).dt.strftime("%Y-%m-%d")
+    adm_txt[rng.random(n) < 0.002] = None   # alguns cadastros sem admissão
+
+    n_dir, n_cc, n_cargo = 12, 300, 150
+    diretoria = rng.integers(0, n_dir, n)
+    return pd.DataFrame({
+        "Matricula": np.char.add("M", np.arange(n).astype(str)),
+        "Nome": np.char.add("Colaborador ", np.arange(n).astype(str)),
+        "Cargo": np.char.add("Cargo ", rng.integers(0, n_cargo, n).astype(str)),
+        "Salario": rng.lognormal(np.log(6500), 0.6, n).round(2),
+        "Data_Admissao": adm_txt,
+        "Data_Desligamento": desl_txt,
+        "Diretoria": np.char.add("Diretoria ", diretoria.astype(str)),
+        "Centro_Custo": np.char.add("CC", (diretoria * 1000 + rng.integers(0, n_cc // n_dir, n)).astype(str)),
+        "Valor_Pago_2025": np.where(rng.random(n) < 0.3, rng.uniform(0, 4000, n).round(2), 0.0),
+        "Motivo_Afastamento": rng.choice(
+            ["nenhum", "doença", "acidente", "licença-maternidade", "licenca-maternidade", "Doença ", "outro"],
+            n, p=[0.85, 0.05, 0.02, 0.03, 0.01, 0.02, 0.02]
+        ),
+        "Conta_Ativa": rng.choice(["sim", "não"], n, p=[0.97, 0.03]),
+    })
+
+# =========================
+# Medição
+# =========================
+def medir(func, com_memoria: bool = True) -> dict:
+    """Tempo de parede da execução normal e, à parte, pico de memória alocada (tracemalloc)."""
+    gc.collect()
+    t0 = time.perf_counter()
+    resultado = func()
+    segundos = time.perf_counter() - t0
+    pico = None
+    if com_memoria:
+        del resultado
+        gc.collect()
+        tracemalloc.start()
+        resultado = func()
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"segundos": round(segundos, 4), "pico_bytes": pico}, resultado
+
+def _tetos(base_calc):
+    base_calc = base_calc.copy(deep=False)
+    aplicar_tetos(base_calc, LUCRO, True)
+    return finalizar_resultado(base_calc)
+
+def _formatacao_antiga(base_calc):
+    display_df = base_calc.copy()
+    for c in MONEY_COLS:
+        display_df[c] = display_df[c].apply(fmt_brl)
+    return display_df
+
+def _formatacao_paginada(base_calc):
+    pagina, _ = paginar(base_calc, {}, "PLR_Antecipacao_Total", False, 1, 100)
+    return com_motivo_texto(pagina).style.format(fmt_brl, subset=MONEY_COLS).to_html()
+
+ETAPAS = [
+    "apuracao_completa",
+    "ensure_required_columns", "compactar_base", "deduplicacao", "elegibilidade_linha_a_linha", "elegibilidade",
+    "tetos", "cubo_totais", "formatacao_brl", "formatacao_paginada", "excel",
+]
+
+def executar(n: int, etapas: list, semente: int, com_memoria: bool) -> list:
+    bruta = gerar_base_sintetica(n, semente)
+    medidas = []
+
+    def registrar(etapa, func):
+        m, resultado = medir(func, com_memoria)
+        medidas.append({"linhas": n, "etapa": etapa, **m})
+        pico = "" if m["pico_bytes"] is None else f"  pico {m['pico_bytes'] / 2**20:9.1f} MiB"
+        print(f"{n:>9} {etapa:<28} {m['segundos']:9.3f} s{pico}", file=sys.stderr)
+        return resultado
+
+    # Etapas fora de `etapas` rodam sem medição quando são pré-requisito das seguintes
+    def etapa(nome, func):
+        return registrar(nome, func) if nome in etapas else func()
+
+    # Pipeline inteiro, a partir da base bruta (como no app e no plr_cli.py)
+    if "apuracao_completa" in etapas:
+        registrar("apuracao_completa", lambda: calcular_antecipacao(bruta, LUCRO, DATA_ASSINATURA, True))
+
+    # As mesmas etapas, uma a uma
+    base = etapa("ensure_required_columns", lambda: ensure_required_columns(bruta))
+    base = etapa("compactar_base", lambda: compactar_base(base))
+    base = etapa("deduplicacao", lambda: indexar_por_matricula(base))
+    if "elegibilidade_linha_a_linha" in etapas:
+        registrar("elegibilidade_linha_a_linha", lambda: base.apply(
+            lambda r: calcular_proporcionalidade_especial(r, DATA_ASSINATURA), axis=1))
+    base_calc = etapa("elegibilidade", lambda: aplicar_elegibilidade(base.copy(deep=False), DATA_ASSINATURA))
+    resultado = etapa("tetos", lambda: _tetos(base_calc))
+    # Memória ocupada pelo resultado (strings contadas por inteiro), por coluna
+    uso = resultado.memory_usage(index=True, deep=True)
+    medidas.append({"linhas": n, "etapa": "memoria_resultado", "memoria_bytes": int(uso.sum()),
+                    "por_coluna": {c: int(v) for c, v in uso.items()}})
+    print(f"{n:>9} {'memoria_resultado':<28} {uso.sum() / 2**20:9.1f} MiB", file=sys.stderr)
+    if "cubo_totais" in etapas:
+        registrar("cubo_totais", lambda: calcular_cubo(resultado))
+    if "formatacao_brl" in etapas:
+        registrar("formatacao_brl", lambda: _formatacao_antiga(resultado))
+    if "formatacao_paginada" in etapas:
+        registrar("formatacao_paginada", lambda: _formatacao_paginada(resultado))
+    if "excel" in etapas:
+        registrar("excel", lambda: to_excel_bytes(planilhas_resultado(resultado, arredondar=False), casas=2))
+    return medidas
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark das etapas da Calculadora de PLR.")
+    p.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO, help="Linhas da base sintética")
+    p.add_argument("--etapas", nargs="+", choices=ETAPAS, default=ETAPAS, help="Etapas medidas")
+    p.add_argument("--semente", type=int, default=42)
+    p.add_argument("--sem-memoria", action="store_true", help="Mede só o tempo (sem a segunda execução com tracemalloc)")
+    p.add_argument("--saida", default=None, help="Arquivo JSON com as medidas (padrão: stdout)")
+    return p.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    medidas = []
+    for n in args.tamanhos:
+        medidas.extend(executar(n, args.etapas, args.semente, not args.sem_memoria))
+    relatorio = {
+        "quando": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "maquina": platform.platform(),
+        "semente": args.semente,
+        "medidas": medidas,
+    }
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
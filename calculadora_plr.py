@@ -3,78 +3,154 @@
 # Mantém: adicional com teto proporcional aos meses; entrada só "Salario"; UI BRL "R$ 6.485,86"
 #
 # Rodar: streamlit run calculadora_plr.py
+# Regras de cálculo em plr_engine.py; modo em lote (sem Streamlit) em plr_cli.py
+
+import os
 
 import streamlit as st
 import pandas as pd
 import numpy as np
-from io import BytesIO
 
-st.set_page_config(page_title="Calculadora de PLR – Antecipação 2025", layout="wide")
+from plr_engine import (
+    REQUIRED_COLS, PCT_LUCRO_BASICA, MONEY_COLS,
+    fmt_brl, fmt_inteiro, ensure_required_columns, deduplicar_matricula, colunas_vazias,
+    calcular_antecipacao, com_motivo_texto, paginar,
+    DIMENSOES_CUBO, MEDIDAS_CUBO, calcular_cubo, totais_por, dimensoes_preenchidas,
+)
+from plr_io import (
+    LIMITE_LINHAS_EXCEL, ler_base, ler_csv_em_blocos, planilha_resultado, planilhas_resultado,
+    nomes_planilhas_totais, planilha_totais, to_excel_bytes, to_csv_zip_bytes, to_parquet_bytes,
+)
+from plr_cache import CacheLRU, hash_bytes, hash_params
+from plr_incremental import ApuracaoIncremental
+from plr_cenarios import simular_cenarios
+from plr_lote import CASAS_LOTE, ler_parametros, nome_entidade, processar_lote, resumo_lote, planilhas_lote
+from plr_metricas import Medidor
+from plr_store import BaseManual
+from plr_tarefas import LINHAS_EM_SEGUNDO_PLANO, TarefaApuracao
 
-# =========================
-# Colunas e defaults globais
-# =========================
-REQUIRED_COLS = [
-    "Matricula", "Nome", "Cargo",
-    "Salario",
-    "Data_Admissao", "Data_Desligamento",
-    "Diretoria", "Centro_Custo",
-    "Valor_Pago_2025", "Motivo_Afastamento", "Conta_Ativa"
-]
-DERIVED_COLS = ["Salario_Base", "Verbas_Fixas_Salariais"]
-
-DEFAULTS = {
-    "Salario": 0.0,
-    "Data_Desligamento": None,
-    "Diretoria": "",
-    "Centro_Custo": "",
-    "Valor_Pago_2025": 0.0,
-    "Motivo_Afastamento": "nenhum",
-    "Conta_Ativa": "sim",
-}
+st.set_page_config(page_title="Calculadora de PLR – Antecipação 2025", layout="wide")
 
 # Estado inicial
-if "manual_df" not in st.session_state:
-    st.session_state.manual_df = pd.DataFrame(columns=REQUIRED_COLS + DERIVED_COLS)
+if "versao_editor_manual" not in st.session_state:
+    st.session_state.versao_editor_manual = 0
 if "data_assinatura_cct" not in st.session_state:
     st.session_state.data_assinatura_cct = pd.to_datetime("2025-09-01").date()
+if "apuracao_manual" not in st.session_state:
+    st.session_state.apuracao_manual = ApuracaoIncremental()
 
 # =========================
-# Helpers de formatação
+# Cache entre reruns (por conteúdo)
 # =========================
-def fmt_brl(x) -> str:
-    try:
-        v = float(x)
-    except (TypeError, ValueError):
-        return "R$ 0,00"
-    return f"R$ {v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-def ensure_required_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df.columns = df.columns.str.strip()
-
-    # Compat: se não vier "Salario" mas vierem as colunas antigas, somar para formar "Salario"
-    if "Salario" not in df.columns:
-        if ("Salario_Base" in df.columns) and ("Verbas_Fixas_Salariais" in df.columns):
-            df["Salario"] = pd.to_numeric(df["Salario_Base"], errors="coerce").fillna(0.0) + \
-                            pd.to_numeric(df["Verbas_Fixas_Salariais"], errors="coerce").fillna(0.0)
-        else:
-            df["Salario"] = 0.0
-
-    for col in REQUIRED_COLS:
-        if col not in df.columns:
-            df[col] = DEFAULTS.get(col, np.nan)
+@st.cache_resource
+def obter_caches():
+    return {
+        "uploads": CacheLRU("uploads", 512 * 2**20),
+        "resultados": CacheLRU("resultados", 512 * 2**20),
+        "exportacoes": CacheLRU("exportacoes", 256 * 2**20),
+    }
+
+CACHES = obter_caches()
+
+@st.cache_resource
+def obter_base_manual():
+    """Cadastro manual persistido (SQLite), compartilhado entre sessões."""
+    return BaseManual()
+
+def salvar_edicoes(base_manual, original: pd.DataFrame, editada: pd.DataFrame) -> bool:
+    """Grava no cadastro as linhas incluídas/alteradas e apaga as removidas da página; True se algo mudou."""
+    def _linhas(df):
+        return df.astype(str).apply(tuple, axis=1)
+
+    alteradas = editada[~_linhas(editada).isin(set(_linhas(original)))]
+    alteradas = alteradas[alteradas["Matricula"].notna() & (alteradas["Matricula"].astype(str).str.strip() != "")]
+    removidas = set(original["Matricula"]) - set(editada["Matricula"].dropna().astype(str).str.strip())
+    if alteradas.empty and not removidas:
+        return False
+    base_manual.remover(removidas)
+    base_manual.upsert(alteradas)
+    return True
+
+def impressao_upload(up) -> tuple:
+    """(hash dos bytes, extensão) do arquivo enviado; o hash é calculado uma vez por arquivo (file_id)."""
+    ext = up.name.lower().rsplit(".", 1)[-1]
+    file_id = getattr(up, "file_id", None)
+    memo = st.session_state.get("impressao_upload")
+    if file_id is None or memo is None or memo[0] != file_id:
+        memo = (file_id, (hash_bytes(up.getvalue()), ext))
+        st.session_state.impressao_upload = memo
+    return memo[1]
+
+def carregar_upload(up):
+    """Lê o arquivo enviado; mesmos bytes reaproveitam a base já normalizada."""
+    chave = impressao_upload(up)
+    ext = chave[1]
+
+    def _ler():
+        if ext == "csv":
+            # CSV: leitura em blocos, já normalizada e com colunas compactas
+            return ler_csv_em_blocos(up)
+        return ensure_required_columns(ler_base(up)), {}
+
+    return CACHES["uploads"].get_or_compute(chave, _ler)
 
-    df["Salario"] = pd.to_numeric(df["Salario"], errors="coerce").fillna(0.0)
-    df["Valor_Pago_2025"] = pd.to_numeric(df.get("Valor_Pago_2025", 0.0), errors="coerce").fillna(0.0)
-    for c in ["Data_Admissao", "Data_Desligamento"]:
-        df[c] = pd.to_datetime(df[c], errors="coerce")
-
-    # Derivados a partir de "Salario"
-    df["Salario_Base"] = df["Salario"] / 1.55
-    df["Verbas_Fixas_Salariais"] = df["Salario_Base"] * 0.55
+# =========================
+# Apuração em segundo plano (bases grandes)
+# =========================
+@st.fragment(run_every=1.0)
+def painel_progresso():
+    """Atualiza só este trecho a cada segundo; ao fim da tarefa, refaz a página para exibir o resultado."""
+    tarefa = st.session_state.get("tarefa_apuracao")
+    if tarefa is None:
+        return
+    if not tarefa.ativa:
+        st.rerun()
+    st.markdown(f"**Apuração em andamento** – {tarefa.segundos:.0f} s")
+    for etapa, (feitas, total) in tarefa.progresso.items():
+        st.progress(min(1.0, feitas / total) if total else 1.0,
+                    text=f"{etapa}: {fmt_inteiro(feitas)} de {fmt_inteiro(total)} linha(s)")
+    if st.button("Cancelar apuração"):
+        tarefa.cancelar()
+
+def apuracao_em_segundo_plano(chave, base, lucro_liquido, data_assinatura, compensar, redistribuir=False):
+    """
+    (resultado, resumo) se a apuração de `chave` já terminou (sessão ou cache); senão dispara
+    ou acompanha a tarefa em segundo plano e devolve (None, None).
+    """
+    anexado = st.session_state.get("resultado_apuracao")
+    if anexado is not None and anexado["chave"] == chave:
+        return anexado["resultado"]
+    em_cache = CACHES["resultados"].get(chave)
+    if em_cache is not None:
+        return em_cache
+
+    tarefa = st.session_state.get("tarefa_apuracao")
+    if tarefa is None or tarefa.chave != chave:
+        # Parâmetros ou base mudaram: a tarefa anterior é descartada
+        if tarefa is not None:
+            tarefa.cancelar()
+        auxiliar = Medidor(ativo=medidor.ativo, registrar_log=medidor.registrar_log, contexto=medidor.contexto)
+        tarefa = TarefaApuracao(chave, base, lucro_liquido, data_assinatura, compensar, medidor=auxiliar,
+                                redistribuir=redistribuir).iniciar()
+        st.session_state.tarefa_apuracao = tarefa
+
+    if tarefa.estado == "concluida":
+        CACHES["resultados"].put(chave, tarefa.resultado)
+        st.session_state.resultado_apuracao = {"chave": chave, "resultado": tarefa.resultado}
+        medidor.etapas.extend(tarefa.medidor.etapas)
+        del st.session_state.tarefa_apuracao
+        return tarefa.resultado
+    if tarefa.estado in ("cancelada", "erro"):
+        if tarefa.estado == "cancelada":
+            st.warning("Apuração cancelada. Clique em **Calcular Antecipação** para recomeçar.")
+        else:
+            st.error(f"A apuração falhou: {tarefa.erro}")
+        del st.session_state.tarefa_apuracao
+        st.session_state.apuracao_ativa = False
+        return None, None
 
-    return df
+    painel_progresso()
+    return None, None
 
 # =========================
 # Sidebar
@@ -101,6 +177,20 @@ lucro_liquido_1s2025 = st.sidebar.number_input(
 compensar_planos_proprios = st.sidebar.checkbox(
     "Compensar valores já pagos em 2025 (Regra Básica)", value=False
 )
+redistribuir_tetos = st.sidebar.checkbox(
+    "Redistribuir excedente dos tetos individuais", value=False,
+    help="Quando o teto global de 12,8% limita a Regra Básica, ele é repartido proporcionalmente à base de "
+         "cada um, e o que passa do teto individual de alguém vai para quem ainda está abaixo do seu "
+         "(em vez de um fator único de redução). A Parcela Adicional não muda: o teto dela acompanha a "
+         "Proporcionalidade, a mesma do rateio, então não há excedente para repassar."
+)
+medir_etapas = st.sidebar.checkbox(
+    "Medir etapas da apuração (diagnóstico)", value=False,
+    help="Tempo, linhas e memória de cada etapa, exibidos na aba Apuração. "
+         "Com PLR_LOG_METRICAS=1 no ambiente, as medidas também vão para o log (uma linha JSON por etapa)."
+)
+medidor = Medidor(ativo=medir_etapas, registrar_log=os.environ.get("PLR_LOG_METRICAS") == "1",
+                  contexto={"origem": "app"})
 
 # =========================
 # Título e abas
@@ -108,7 +198,9 @@ compensar_planos_proprios = st.sidebar.checkbox(
 st.title("Calculadora de PLR – Antecipação 2025")
 st.caption("Regra de antecipação (caput + §1º–§4º) com adicional e seu teto individual proporcionais aos meses/12.")
 
-aba_base, aba_calc, aba_export = st.tabs(["Base (Manual/Upload)", "Apuração", "Exportação"])
+aba_base, aba_calc, aba_export, aba_sim, aba_lote = st.tabs(
+    ["Base (Manual/Upload)", "Apuração", "Exportação", "Simulação", "Lote (multi-entidade)"]
+)
 
 # =========================
 # Base (Manual/Upload)
@@ -140,9 +232,12 @@ with aba_base:
             substituir = st.checkbox("Substituir se Matrícula já existir", value=True)
             add = st.form_submit_button("Adicionar à base")
 
+        base_manual = obter_base_manual()
         if add:
             if not matricula:
                 st.error("Informe a Matrícula antes de adicionar.")
+            elif not substituir and base_manual.existe(matricula):
+                st.error(f"A Matrícula {matricula} já existe no cadastro (marque 'Substituir' para atualizá-la).")
             else:
                 nova = {
                     "Matricula": matricula,
@@ -157,277 +252,299 @@ with aba_base:
                     "Motivo_Afastamento": motivo,
                     "Conta_Ativa": conta_ativa,
                 }
-                df = st.session_state.manual_df.copy()
-                if substituir and "Matricula" in df.columns:
-                    df = df[df["Matricula"] != matricula]
-                st.session_state.manual_df = pd.concat([df, pd.DataFrame([nova])], ignore_index=True)
+                base_manual.upsert(pd.DataFrame([nova]))
+                st.session_state.versao_editor_manual += 1
 
         st.markdown("### Base (Cadastro manual)")
-        st.session_state.manual_df = ensure_required_columns(st.session_state.manual_df)
-        st.session_state.manual_df = st.data_editor(
-            st.session_state.manual_df,
+        st.caption("Gravada em disco (SQLite): continua disponível em novas sessões. "
+                   "O editor mostra uma página por vez; edições, inclusões e exclusões são salvas ao sair da célula.")
+        colp1, colp2, colp3 = st.columns([3, 1, 1])
+        with colp1:
+            busca_manual = st.text_input("Buscar (Matrícula ou Nome)", key="busca_manual")
+        with colp2:
+            tamanho_manual = st.selectbox("Linhas por página", [50, 100, 250, 500], index=1, key="tamanho_pagina_manual")
+        n_manual = base_manual.contar(busca_manual)
+        paginas_manual = max(1, -(-n_manual // tamanho_manual))
+        with colp3:
+            pagina_manual = st.number_input("Página", min_value=1, max_value=paginas_manual, value=1, step=1,
+                                            key="pagina_manual")
+
+        pagina_manual_df = base_manual.pagina(min(pagina_manual, paginas_manual), tamanho_manual, busca_manual)
+        editada = st.data_editor(
+            pagina_manual_df,
             num_rows="dynamic",
             use_container_width=True,
-            key="editor_manual"
+            hide_index=True,
+            # Chave nova após cada gravação: o editor recomeça da página já salva
+            key=f"editor_manual_{st.session_state.versao_editor_manual}"
         )
+        if salvar_edicoes(base_manual, pagina_manual_df, editada):
+            st.session_state.versao_editor_manual += 1
+            st.rerun()
+        st.caption(f"{fmt_inteiro(n_manual)} colaborador(es) no cadastro" + (" (com a busca)." if busca_manual else "."))
+
+        with st.expander("Apagar cadastro manual"):
+            confirmar = st.checkbox("Confirmo que quero apagar todas as linhas do cadastro manual")
+            if st.button("Apagar tudo", disabled=not confirmar):
+                base_manual.limpar()
+                st.session_state.versao_editor_manual += 1
+                st.rerun()
 
         # Template CSV
         tmpl = pd.DataFrame(columns=REQUIRED_COLS)
         csv_bytes = tmpl.to_csv(index=False).encode("utf-8")
         st.download_button("Baixar template CSV", data=csv_bytes, file_name="template_plr.csv", mime="text/csv")
 
-        base = st.session_state.manual_df.copy()
+        # Só as Matrículas gravadas/removidas desde o rerun anterior são lidas do SQLite e reavaliadas
+        apuracao = st.session_state.apuracao_manual
+        with medidor.etapa("sincronizacao_incremental") as e:
+            delta_manual = apuracao.sincronizar(base_manual, data_assinatura_cct)
+            base = e.df = apuracao.base()
+        # Versão que a apuração de fato leu (outra sessão pode ter gravado depois)
+        chave_base = ("manual", apuracao.impressao)
 
     else:
         st.markdown("Faça upload do arquivo com as colunas mínimas exigidas (use o template, se possível).")
-        up = st.file_uploader("CSV ou Excel (UTF-8)", type=["csv", "xlsx"])
+        up = st.file_uploader("CSV, Excel (UTF-8) ou Parquet", type=["csv", "xlsx", "parquet"])
 
         if up is None:
-            base = pd.DataFrame(columns=REQUIRED_COLS)
+            base = ensure_required_columns(pd.DataFrame(columns=REQUIRED_COLS))
+            chave_base = ("vazia",)
             st.info("Nenhum arquivo carregado. A base está vazia (você pode usar o cadastro manual).")
         else:
-            if up.name.endswith(".csv"):
-                base = pd.read_csv(up)
+            with medidor.etapa("leitura") as e:
+                base, relatorio = carregar_upload(up)
+                e.df = base
+            invalidos = {k: v for k, v in relatorio.items() if k.endswith(("_invalida", "_invalido")) and v}
+            if invalidos:
+                st.warning(f"Valores que não puderam ser convertidos (tratados como vazios/0): {invalidos}")
+
+            n_correcoes = obter_base_manual().contar()
+            if st.checkbox(f"Aplicar as correções do cadastro manual sobre o arquivo ({fmt_inteiro(n_correcoes)} linha(s))",
+                           value=False, disabled=n_correcoes == 0,
+                           help="Matrículas do cadastro substituem as do arquivo; as que não existirem no arquivo são incluídas."):
+                with medidor.etapa("correcoes_manuais") as e:
+                    # Correções e versão lidas juntas: a chave é a da versão aplicada
+                    correcoes, _, impressao_cadastro = obter_base_manual().ler_desde(None)
+                    chave_base = ("upload", impressao_upload(up), impressao_cadastro)
+                    base = e.df = obter_base_manual().aplicar_sobre(base, correcoes)
             else:
-                base = pd.read_excel(up)
-
-        base = ensure_required_columns(base)
+                chave_base = ("upload", impressao_upload(up))
         st.dataframe(base, use_container_width=True)
 
+    # Impressão digital da base montada a partir das chaves já conhecidas (bytes do arquivo,
+    # versão do cadastro, opções) – sem percorrer a base a cada rerun
+    chave_base = chave_base + (dedup_toggle,)
+
     # Deduplicação por Matrícula (mantém a última)
-    if dedup_toggle and "Matricula" in base.columns:
-        base = base.drop_duplicates(subset=["Matricula"], keep="last").reset_index(drop=True)
+    if dedup_toggle:
+        with medidor.etapa("deduplicacao") as e:
+            base = e.df = deduplicar_matricula(base)
 
-    must_have_values = ["Matricula", "Nome", "Salario", "Data_Admissao"]
-    faltantes = [c for c in must_have_values if base[c].isna().all()]
+    faltantes = colunas_vazias(base)
     if faltantes:
         st.warning(f"Estas colunas estão vazias na base: {faltantes}. Preencha/edite antes de apurar.")
 
-# =========================
-# Elegibilidade 2025 (caput + §1–§4) – retorna (proporção, motivo, meses)
-# =========================
-def calcular_proporcionalidade_especial(row, data_assinatura):
-    admissao = pd.to_datetime(row.get("Data_Admissao"), errors="coerce")
-    desligamento_raw = row.get("Data_Desligamento")
-
-    if pd.isna(admissao):
-        return 0.0, "Dados insuficientes (sem Data_Admissao)", 0.0
-
-    if pd.isna(desligamento_raw) or desligamento_raw in (None, "", "nan"):
-        desligamento = None
-    else:
-        desligamento = pd.to_datetime(desligamento_raw, errors="coerce")
-        if pd.isna(desligamento):
-            desligamento = None
-
-    motivo = str(row.get("Motivo_Afastamento", "")).lower().strip()
-    if motivo == "licenca-maternidade":
-        motivo = "licença-maternidade"
-
-    assinatura = pd.to_datetime(data_assinatura)
-
-    def meses_12avos(inicio, fim):
-        """
-        Conta 1/12 por mês com fração >= 15 dias,
-        MAS o mês de admissão só conta se o dia da admissão for <= 15.
-        """
-        if pd.isna(inicio) or pd.isna(fim) or inicio > fim:
-            return 0.0
-        total = 0
-        cur = pd.Timestamp(year=inicio.year, month=inicio.month, day=1)
-        end = pd.Timestamp(year=fim.year, month=fim.month, day=1)
-        while cur <= end:
-            mes_ini = cur
-            mes_fim = (cur + pd.offsets.MonthEnd(0))
-            seg_ini = max(inicio, mes_ini)
-            seg_fim = min(fim, mes_fim)
-            dias = (seg_fim - seg_ini).days + 1
-
-            conta_mes = False
-            # Se for o mês da admissão, exige dia <= 15 para poder contar
-            if (cur.year == inicio.year) and (cur.month == inicio.month):
-                if inicio.day <= 15 and dias >= 15:
-                    conta_mes = True
-            else:
-                if dias >= 15:
-                    conta_mes = True
-
-            if conta_mes:
-                total += 1
-
-            cur = cur + pd.offsets.MonthBegin(1)
-        return min(12.0, float(total))
-
-    # §1º – admitido até 31/12/2024, afastado, ativo na assinatura → integral
-    if (admissao <= pd.Timestamp("2024-12-31")) and (motivo in ["doença", "acidente", "licença-maternidade"]) and (desligamento is None or desligamento > assinatura):
-        return 1.0, "§1º – Admitido até 31/12/2024 com afastamento coberto; ativo na assinatura (integral).", 12.0
-
-    # §2º – admitido a partir de 01/01/2025, efetivo na assinatura → proporcional até 31/12/2025
-    if (admissao >= pd.Timestamp("2025-01-01")) and (desligamento is None or desligamento > assinatura):
-        meses = meses_12avos(admissao, pd.Timestamp("2025-12-31"))
-        prop = float(meses / 12.0)
-        return prop, f"§2º – Admitido em 2025; proporcional {meses:.0f}/12 até 31/12/2025.", meses
-
-    # §3º – dispensado sem justa causa entre 02/08/2025 e a assinatura → proporcional até desligamento
-    if (desligamento is not None) and (pd.Timestamp("2025-08-02") <= desligamento <= assinatura):
-        meses = meses_12avos(admissao, desligamento)
-        prop = float(meses / 12.0)
-        return prop, f"§3º – Dispensado sem justa causa entre 02/08/2025 e assinatura; proporcional {meses:.0f}/12.", meses
-
-    # CAPUT – ativo na assinatura → integral
-    if (desligamento is None) or (desligamento > assinatura):
-        return 1.0, "Caput – Empregado ativo na data da assinatura (integral).", 12.0
-
-    # §4º – não elegível
-    return 0.0, "§4º – Não elegível.", 0.0
-
 # =========================
 # Apuração
 # =========================
 with aba_calc:
     st.subheader("Apuração – Antecipação 2025")
 
-    calcular = st.button("Calcular Antecipação", type="primary")
+    # A apuração continua ativa nos reruns seguintes (filtros, paginação); o cache evita recalcular
+    if st.button("Calcular Antecipação", type="primary"):
+        st.session_state.apuracao_ativa = True
 
-    if not calcular:
+    if not st.session_state.get("apuracao_ativa"):
         st.info("Preencha o sidebar e a base, depois clique em **Calcular Antecipação**.")
     else:
         if base.empty:
             st.warning("Nenhuma base carregada ou cadastrada. Use a aba 'Base (Manual/Upload)'.")
         else:
-            # Parâmetros da cláusula
-            FIXO_BASICA = 2005.82
-            LIMITE_BASICA_INDIV = 10760.26
-            PCT_LUCRO_BASICA = 0.128   # 12,8%
-            PCT_LUCRO_ADIC   = 0.022   # 2,2%
-            LIMITE_ADIC_INDIV = 3471.13
-
-            base_calc = ensure_required_columns(base)
-
-            # Proporcionalidade (caput + parágrafos)
-            trip = base_calc.apply(lambda r: calcular_proporcionalidade_especial(r, data_assinatura_cct), axis=1)
-            base_calc["Proporcionalidade"] = trip.apply(lambda x: x[0])
-            base_calc["Motivo_Elegibilidade"] = trip.apply(lambda x: x[1])
-            base_calc["Meses_Contabilizados"] = trip.apply(lambda x: x[2])
-            base_calc["Elegivel"] = np.where(base_calc["Proporcionalidade"] > 0, "Sim", "Não")
-
-            # Elegíveis (sem duplicata)
-            elegiveis = base_calc[base_calc["Proporcionalidade"] > 0].copy()
-            if "Matricula" in elegiveis.columns:
-                elegiveis = elegiveis.drop_duplicates(subset=["Matricula"], keep="last")
-
-            n_elegiveis = int(elegiveis.shape[0])
-
-            if n_elegiveis == 0:
-                st.warning("Nenhum colaborador elegível pelas regras (caput/§§). Confira datas e motivos de afastamento.")
+            chave_resultado = (
+                chave_base,
+                hash_params(float(lucro_liquido_1s2025), data_assinatura_cct, compensar_planos_proprios,
+                            redistribuir_tetos),
+            )
+            if modo == "Cadastro manual":
+                # Cadastro manual: elegibilidade já sincronizada na aba Base; aqui só os tetos
+                with medidor.etapa("tetos") as e:
+                    resultado, resumo = CACHES["resultados"].get_or_compute(
+                        chave_resultado, apuracao.resultado, lucro_liquido_1s2025, compensar_planos_proprios,
+                        redistribuir=redistribuir_tetos
+                    )
+                    e.df = resultado
+                if any(delta_manual.values()):
+                    st.caption(
+                        f"Apuração incremental: {delta_manual['novas']} nova(s), {delta_manual['alteradas']} alterada(s), "
+                        f"{delta_manual['removidas']} removida(s) desde a sincronização anterior."
+                    )
+            elif len(base) < LINHAS_EM_SEGUNDO_PLANO:
+                # Etapas internas só aparecem quando o resultado não veio do cache
+                with medidor.etapa("apuracao_total") as e:
+                    resultado, resumo = CACHES["resultados"].get_or_compute(
+                        chave_resultado, calcular_antecipacao,
+                        base, lucro_liquido_1s2025, data_assinatura_cct, compensar_planos_proprios,
+                        medidor=medidor, redistribuir=redistribuir_tetos
+                    )
+                    e.df = resultado
             else:
-                # Regra Básica: 54% * Salario + FIXO, vezes proporcionalidade
-                elegiveis["Base_PLR_Basica"] = (0.54 * elegiveis["Salario"].astype(float) + FIXO_BASICA) * elegiveis["Proporcionalidade"]
-
-                # Cap individual (Básica)
-                elegiveis["Basica_Indiv_Cap"] = elegiveis["Base_PLR_Basica"].clip(upper=LIMITE_BASICA_INDIV)
-
-                # Cap global 12,8% do lucro 1S/2025 (Básica)
-                total_basica_pre_cap = float(elegiveis["Basica_Indiv_Cap"].sum())
-                limite_global_basica = PCT_LUCRO_BASICA * float(lucro_liquido_1s2025)
-                fator_cap = 1.0
-                if limite_global_basica == 0:
-                    st.warning("O lucro 1S/2025 está 0. O teto global (12,8%) zera a Regra Básica.")
-                if limite_global_basica > 0 and total_basica_pre_cap > limite_global_basica:
-                    fator_cap = limite_global_basica / total_basica_pre_cap
-                elegiveis["Basica_Pos_Global"] = elegiveis["Basica_Indiv_Cap"] * fator_cap
-
-                # Compensação (Básica)
-                if compensar_planos_proprios:
-                    pagos = elegiveis["Valor_Pago_2025"].astype(float).fillna(0.0)
-                    elegiveis["Basica_Final"] = (elegiveis["Basica_Pos_Global"] - pagos).clip(lower=0.0)
-                else:
-                    elegiveis["Basica_Final"] = elegiveis["Basica_Pos_Global"]
-
-                # Parcela Adicional – proporcional aos meses (Proporcionalidade) + teto individual proporcional
-                pool_adic = PCT_LUCRO_ADIC * float(lucro_liquido_1s2025)
-                if pool_adic == 0:
-                    st.warning("O lucro 1S/2025 está 0. A Parcela Adicional (2,2%) será 0.")
-                soma_props = float(elegiveis["Proporcionalidade"].sum())
-                if soma_props > 0:
-                    elegiveis["Adicional_Base"] = pool_adic * (elegiveis["Proporcionalidade"] / soma_props)
-                else:
-                    elegiveis["Adicional_Base"] = 0.0
-
-                # Teto individual proporcional: 3.471,13 * Proporcionalidade
-                elegiveis["Teto_Adic_Proporcional"] = LIMITE_ADIC_INDIV * elegiveis["Proporcionalidade"].clip(lower=0.0, upper=1.0)
-                elegiveis["Adicional_Final"] = np.minimum(elegiveis["Adicional_Base"], elegiveis["Teto_Adic_Proporcional"])
-
-                # Merge back (com base sem duplicatas por Matrícula)
-                base_calc = base_calc.drop_duplicates(subset=["Matricula"], keep="last")
-                base_calc = base_calc.merge(
-                    elegiveis[[
-                        "Matricula", "Basica_Final",
-                        "Adicional_Base", "Teto_Adic_Proporcional", "Adicional_Final",
-                        "Basica_Pos_Global", "Basica_Indiv_Cap", "Base_PLR_Basica"
-                    ]],
-                    on="Matricula", how="left"
+                # Base grande: apuração numa thread, com progresso e cancelamento; a interface segue livre
+                resultado, resumo = apuracao_em_segundo_plano(
+                    chave_resultado, base, lucro_liquido_1s2025, data_assinatura_cct, compensar_planos_proprios,
+                    redistribuir_tetos
                 )
-                for col in ["Basica_Final", "Adicional_Final", "Adicional_Base", "Teto_Adic_Proporcional",
-                            "Basica_Pos_Global", "Basica_Indiv_Cap", "Base_PLR_Basica"]:
-                    base_calc[col] = base_calc[col].fillna(0.0)
-
-                base_calc["PLR_Antecipacao_Total"] = base_calc["Basica_Final"] + base_calc["Adicional_Final"]
-
-                # ===== Exibição com formatação BRL (apenas na UI) =====
-                money_cols = [
-                    "Salario", "Base_PLR_Basica", "Basica_Indiv_Cap", "Basica_Pos_Global", "Basica_Final",
-                    "Adicional_Base", "Teto_Adic_Proporcional", "Adicional_Final", "PLR_Antecipacao_Total"
-                ]
-                display_df = base_calc.copy()
-                for c in money_cols:
-                    if c in display_df.columns:
-                        display_df[c] = display_df[c].apply(fmt_brl)
-
-                # Métricas (formatadas)
-                total_basica_final = base_calc["Basica_Final"].sum()
-                total_adicional_final = base_calc["Adicional_Final"].sum()
-                total_antecipacao = base_calc["PLR_Antecipacao_Total"].sum()
-
-                colm1, colm2, colm3, colm4 = st.columns(4)
-                with colm1:
-                    st.metric("Elegíveis", f"{n_elegiveis}")
-                with colm2:
-                    st.metric("Total Regra Básica (após cap)", fmt_brl(total_basica_final))
-                with colm3:
-                    st.metric("Total Parcela Adicional (pós cap indiv.)", fmt_brl(total_adicional_final))
-                with colm4:
-                    st.metric("Antecipação Total", fmt_brl(total_antecipacao))
-
-                st.markdown("### Resultado por Colaborador")
-                desired_cols = [
-                    "Matricula", "Nome", "Cargo", "Diretoria", "Centro_Custo",
-                    "Salario", "Elegivel", "Motivo_Elegibilidade", "Meses_Contabilizados", "Proporcionalidade",
-                    "Base_PLR_Basica", "Basica_Indiv_Cap", "Basica_Pos_Global", "Basica_Final",
-                    "Adicional_Base", "Teto_Adic_Proporcional", "Adicional_Final", "PLR_Antecipacao_Total"
-                ]
-                display_cols = [c for c in desired_cols if c in display_df.columns]
-                missing_cols = [c for c in desired_cols if c not in display_df.columns]
-                if missing_cols:
-                    st.info(f"Colunas ausentes ocultadas: {missing_cols}")
-                st.dataframe(display_df[display_cols], use_container_width=True)
-
-                st.markdown("### Totais por Diretoria")
-                if "Diretoria" in base_calc.columns and not base_calc["Diretoria"].isna().all():
-                    tot_dir = base_calc.groupby("Diretoria", as_index=False)["PLR_Antecipacao_Total"].sum()
-                    tot_dir_display = tot_dir.copy()
-                    tot_dir_display["PLR_Antecipacao_Total"] = tot_dir_display["PLR_Antecipacao_Total"].apply(fmt_brl)
-                    st.dataframe(tot_dir_display.rename(columns={"PLR_Antecipacao_Total": "Total_Antecipacao"}), use_container_width=True)
-
-                st.markdown("### Verificações e Limites")
-                debug_data = {
-                    "Teto Global Regra Básica (12,8% do lucro)": fmt_brl(PCT_LUCRO_BASICA * float(lucro_liquido_1s2025)),
-                    "Soma Individuais antes do cap (Básica)": fmt_brl(total_basica_pre_cap),
-                    "Fator de Redução Aplicado (Básica)": f"{fator_cap:0.6f}",
-                    "Pool Parcela Adicional (2,2% do lucro)": fmt_brl(pool_adic),
-                    "Soma Proporcionalidades (para Adicional)": f"{soma_props:0.6f}",
-                }
-                st.write(debug_data)
+
+            if resumo is not None:
+                n_elegiveis = resumo["n_elegiveis"]
+                total_basica_pre_cap = resumo["total_basica_pre_cap"]
+                fator_cap = resumo["fator_cap"]
+                pool_adic = resumo["pool_adic"]
+                soma_props = resumo["soma_props"]
+
+                if n_elegiveis == 0:
+                    st.warning("Nenhum colaborador elegível pelas regras (caput/§§). Confira datas e motivos de afastamento.")
+                else:
+                    base_calc = resultado
+                    if resumo["limite_global_basica"] == 0:
+                        st.warning("O lucro 1S/2025 está 0. O teto global (12,8%) zera a Regra Básica.")
+                    if pool_adic == 0:
+                        st.warning("O lucro 1S/2025 está 0. A Parcela Adicional (2,2%) será 0.")
+
+                    # Métricas (formatadas)
+                    total_basica_final = base_calc["Basica_Final"].sum()
+                    total_adicional_final = base_calc["Adicional_Final"].sum()
+                    total_antecipacao = base_calc["PLR_Antecipacao_Total"].sum()
+
+                    colm1, colm2, colm3, colm4 = st.columns(4)
+                    with colm1:
+                        st.metric("Elegíveis", f"{n_elegiveis}")
+                    with colm2:
+                        st.metric("Total Regra Básica (após cap)", fmt_brl(total_basica_final))
+                    with colm3:
+                        st.metric("Total Parcela Adicional (pós cap indiv.)", fmt_brl(total_adicional_final))
+                    with colm4:
+                        st.metric("Antecipação Total", fmt_brl(total_antecipacao))
+
+                    st.markdown("### Resultado por Colaborador")
+                    desired_cols = [
+                        "Matricula", "Nome", "Cargo", "Diretoria", "Centro_Custo",
+                        "Salario", "Elegivel", "Motivo_Elegibilidade", "Meses_Contabilizados", "Proporcionalidade",
+                        "Base_PLR_Basica", "Basica_Indiv_Cap", "Basica_Pos_Global", "Basica_Final",
+                        "Adicional_Base", "Teto_Adic_Proporcional", "Adicional_Final", "PLR_Antecipacao_Total"
+                    ]
+                    # Motivo_Elegibilidade é guardado como código; o texto só é montado na página exibida
+                    cols_disponiveis = com_motivo_texto(base_calc.head(0)).columns
+                    display_cols = [c for c in desired_cols if c in cols_disponiveis]
+                    missing_cols = [c for c in desired_cols if c not in cols_disponiveis]
+                    cols_guardadas = ["Codigo_Elegibilidade" if c == "Motivo_Elegibilidade" else c for c in display_cols]
+                    if missing_cols:
+                        st.info(f"Colunas ausentes ocultadas: {missing_cols}")
+
+                    # ===== Grade paginada: números continuam numéricos; BRL só na página exibida =====
+                    def opcoes(col):
+                        return sorted(base_calc[col].dropna().unique(), key=str) if col in base_calc.columns else []
+
+                    colf1, colf2, colf3 = st.columns(3)
+                    with colf1:
+                        filtro_dir = st.multiselect("Diretoria", opcoes("Diretoria"), key="filtro_diretoria")
+                    with colf2:
+                        filtro_cc = st.multiselect("Centro de Custo", opcoes("Centro_Custo"), key="filtro_cc")
+                    with colf3:
+                        filtro_eleg = st.multiselect("Elegível", ["Sim", "Não"], key="filtro_elegivel")
+
+                    colo1, colo2, colo3, colo4 = st.columns([3, 1, 1, 1])
+                    with colo1:
+                        ordenar_por = st.selectbox("Ordenar por", display_cols, index=display_cols.index("PLR_Antecipacao_Total")
+                                                   if "PLR_Antecipacao_Total" in display_cols else 0, key="ordenar_por")
+                    with colo2:
+                        crescente = st.toggle("Crescente", value=False, key="ordem_crescente")
+                    with colo3:
+                        tamanho_pagina = st.selectbox("Linhas por página", [50, 100, 250, 500, 1000], index=1, key="tamanho_pagina")
+
+                    filtros = {"Diretoria": filtro_dir, "Centro_Custo": filtro_cc, "Elegivel": filtro_eleg}
+                    _, n_filtradas = paginar(base_calc, filtros, tamanho_pagina=0)
+                    n_paginas = max(1, -(-n_filtradas // tamanho_pagina))
+                    with colo4:
+                        pagina = st.number_input("Página", min_value=1, max_value=n_paginas, value=1, step=1, key="pagina")
+
+                    with medidor.etapa("grade_paginada") as e:
+                        pagina_df, _ = paginar(base_calc, filtros, ordenar_por, crescente, min(pagina, n_paginas),
+                                               tamanho_pagina, cols_guardadas)
+                        pagina_df = com_motivo_texto(pagina_df)
+                        st.caption(f"{fmt_inteiro(n_filtradas)} linha(s) após filtros – página {min(pagina, n_paginas)} de {n_paginas}.")
+                        st.dataframe(
+                            pagina_df.style.format(fmt_brl, subset=[c for c in MONEY_COLS if c in display_cols]),
+                            use_container_width=True, hide_index=True
+                        )
+                        e.df = pagina_df
+
+                    # Cubo Diretoria × Centro_Custo × Cargo: uma leitura da base por resultado; as visões
+                    # abaixo e as abas de totais da exportação só somam o cubo
+                    with medidor.etapa("cubo_totais") as e:
+                        cubo = CACHES["resultados"].get_or_compute((chave_resultado, "cubo"), calcular_cubo, base_calc)
+                        e.df = cubo
+
+                    preenchidas = dimensoes_preenchidas(cubo)
+                    if preenchidas:
+                        st.markdown("### Totais")
+                        rotulos_dim = {"Diretoria": "Diretoria", "Centro_Custo": "Centro de Custo", "Cargo": "Cargo"}
+                        visao = st.radio(
+                            "Visão", ["Detalhar (Diretoria › Centro de Custo › Cargo)"] + [f"Por {rotulos_dim[c]}" for c in preenchidas],
+                            horizontal=True, key="visao_totais"
+                        )
+                        recorte, dims_visao = cubo, [preenchidas[0]]
+                        if visao.startswith("Detalhar"):
+                            # Cada escolha desce um nível do cubo (xs), até a quebra por Cargo
+                            colt = st.columns(len(DIMENSOES_CUBO) - 1)
+                            for i, dim in enumerate(DIMENSOES_CUBO[:-1]):
+                                valores = sorted(recorte.index.get_level_values(dim).unique())
+                                with colt[i]:
+                                    escolha = st.selectbox(rotulos_dim[dim], ["(todos)"] + valores, key=f"detalhe_{dim}")
+                                dims_visao = [dim]
+                                if escolha == "(todos)":
+                                    break
+                                recorte = recorte.xs(escolha, level=dim, drop_level=False)
+                                dims_visao = [DIMENSOES_CUBO[i + 1]]
+                        else:
+                            dims_visao = [c for c in preenchidas if visao == f"Por {rotulos_dim[c]}"]
+                        tot = totais_por(recorte, dims_visao)
+                        st.dataframe(
+                            tot.style.format(fmt_brl, subset=MEDIDAS_CUBO)
+                               .format(fmt_inteiro, subset=["Colaboradores", "Elegiveis"]),
+                            use_container_width=True, hide_index=True
+                        )
+                        st.caption(f"{fmt_inteiro(len(tot))} linha(s); total do recorte: "
+                                   f"{fmt_brl(tot['PLR_Antecipacao_Total'].sum())}.")
+
+                    st.markdown("### Verificações e Limites")
+                    debug_data = {
+                        "Teto Global Regra Básica (12,8% do lucro)": fmt_brl(PCT_LUCRO_BASICA * float(lucro_liquido_1s2025)),
+                        "Soma Individuais antes do cap (Básica)": fmt_brl(total_basica_pre_cap),
+                        "Fator de Redução Aplicado (Básica)": (
+                            f"não aplicado ({fator_cap:0.6f}) – teto global repartido até os tetos individuais"
+                            if resumo["redistribuir"] and fator_cap < 1.0 else f"{fator_cap:0.6f}"),
+                        "Não distribuído do teto global (Básica)": fmt_brl(resumo["sobra_basica"]),
+                        "Pool Parcela Adicional (2,2% do lucro)": fmt_brl(pool_adic),
+                        "Soma Proporcionalidades (para Adicional)": f"{soma_props:0.6f}",
+                        "Não distribuído do pool (Adicional)": fmt_brl(resumo["sobra_adicional"]),
+                        "Excedente dos tetos redistribuído": "Sim" if resumo["redistribuir"] and fator_cap < 1.0 else "Não",
+                    }
+                    st.write(debug_data)
+
+            if medidor.ativo:
+                with st.expander("Diagnóstico de desempenho (etapas desta execução)"):
+                    etapas = medidor.tabela()
+                    etapas["memoria_MB"] = etapas["memoria_bytes"] / 1e6
+                    st.dataframe(
+                        etapas.drop(columns="memoria_bytes").style.format(
+                            {"segundos": "{:.4f}", "linhas": lambda n: "" if pd.isna(n) else fmt_inteiro(n),
+                             "memoria_MB": "{:.2f}"}, na_rep=""
+                        ),
+                        use_container_width=True, hide_index=True
+                    )
+                    st.caption("normalizacao, deduplicacao, elegibilidade e tetos fazem parte de apuracao_total; "
+                               "com o resultado em cache, só apuracao_total aparece.")
 
 # =========================
 # Exportação (números puros)
@@ -435,23 +552,163 @@ with aba_calc:
 with aba_export:
     st.subheader("Exportar Resultado")
 
-    def to_excel_bytes(df_dict):
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            for name, df in df_dict.items():
-                df.to_excel(writer, index=False, sheet_name=name)
-        return output.getvalue()
-
     if "base_calc" in locals() and 'PLR_Antecipacao_Total' in base_calc.columns and not base.empty:
-        sheets = {"Resultado_Antecipacao": base_calc.round(2)}
-        if "Diretoria" in base_calc.columns and not base_calc["Diretoria"].isna().all():
-            sheets["Totais_Diretoria"] = base_calc.groupby("Diretoria", as_index=False)["PLR_Antecipacao_Total"].sum().round(2)
-        bytes_file = to_excel_bytes(sheets)
+        # Arquivos gerados só no clique (callable), em thread separada, e guardados por impressão digital
+        def exportacao(formato, gerar):
+            return lambda: CACHES["exportacoes"].get_or_compute((chave_resultado, formato), gerar)
+
+        if len(base_calc) <= LIMITE_LINHAS_EXCEL:
+            st.download_button(
+                label="Baixar Excel com Antecipação 2025",
+                data=exportacao("xlsx", lambda: to_excel_bytes(planilhas_resultado(base_calc, arredondar=False, cubo=cubo), casas=2)),
+                file_name=f"PLR_Antecipacao_{ano_ref}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+        else:
+            st.info(f"Resultado com {fmt_inteiro(len(base_calc))} linhas excede o limite do Excel; use o CSV compactado (ZIP) ou o Parquet.")
+
         st.download_button(
-            label="Baixar Excel com Antecipação 2025",
-            data=bytes_file,
-            file_name=f"PLR_Antecipacao_{ano_ref}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            label="Baixar CSV compactado (ZIP)",
+            data=exportacao("zip", lambda: to_csv_zip_bytes(planilhas_resultado(base_calc, cubo=cubo))),
+            file_name=f"PLR_Antecipacao_{ano_ref}.zip",
+            mime="application/zip"
         )
+
+        # Parquet: colunar, preserva tipos de datas e valores (uma tabela por arquivo).
+        # Só os nomes são listados aqui; cada botão monta a sua tabela ao ser clicado, e as
+        # de totais saem do cubo já calculado na Apuração
+        tabelas_parquet = {"Resultado_Antecipacao": lambda: planilha_resultado(base_calc)}
+        tabelas_parquet.update({name: lambda name=name: planilha_totais(cubo, name)
+                                for name in nomes_planilhas_totais(cubo)})
+        for name, tabela in tabelas_parquet.items():
+            st.download_button(
+                label=f"Baixar Parquet – {name}",
+                data=exportacao(("parquet", name), lambda tabela=tabela: to_parquet_bytes(tabela())),
+                file_name=f"PLR_Antecipacao_{ano_ref}_{name}.parquet",
+                mime="application/vnd.apache.parquet",
+                key=f"parquet_{name}"
+            )
     else:
         st.info("Calcule na aba 'Apuração' para habilitar a exportação.")
+
+# =========================
+# Simulação de cenários (lucro × data de assinatura)
+# =========================
+with aba_sim:
+    st.subheader("Simulação de Cenários")
+    st.caption("Totais da antecipação para uma grade de lucros e datas de assinatura, sobre a mesma base.")
+
+    cols1, cols2, cols3 = st.columns(3)
+    with cols1:
+        lucro_min = st.number_input("Lucro inicial (BRL)", min_value=0.0, value=float(lucro_liquido_1s2025), step=1_000_000.0)
+    with cols2:
+        lucro_max = st.number_input("Lucro final (BRL)", min_value=0.0,
+                                    value=max(float(lucro_liquido_1s2025) * 2, 1_000_000.0), step=1_000_000.0)
+    with cols3:
+        n_passos = st.number_input("Quantidade de valores de lucro", min_value=1, max_value=500, value=20, step=1)
+    datas_txt = st.text_input(
+        "Datas de assinatura da CCT (AAAA-MM-DD, separadas por vírgula)",
+        value=str(data_assinatura_cct)
+    )
+
+    if st.button("Simular cenários"):
+        datas_sim = pd.to_datetime([d.strip() for d in datas_txt.split(",") if d.strip()], errors="coerce")
+        if base.empty:
+            st.warning("Nenhuma base carregada ou cadastrada. Use a aba 'Base (Manual/Upload)'.")
+        elif datas_sim.isna().any() or len(datas_sim) == 0:
+            st.error("Datas inválidas. Use o formato AAAA-MM-DD, separadas por vírgula.")
+        else:
+            lucros_sim = np.unique(np.linspace(lucro_min, max(lucro_min, lucro_max), int(n_passos)))
+            chave_sim = (chave_base, hash_params(tuple(lucros_sim), tuple(datas_sim), compensar_planos_proprios))
+            cenarios = CACHES["resultados"].get_or_compute(
+                chave_sim, simular_cenarios, base, lucros_sim, list(datas_sim), compensar_planos_proprios
+            )
+            st.session_state.cenarios = cenarios
+
+    if "cenarios" in st.session_state:
+        cenarios = st.session_state.cenarios
+        st.markdown(f"### {len(cenarios)} cenário(s)")
+        grafico = cenarios.assign(Data_Assinatura=cenarios["Data_Assinatura"].dt.strftime("%d/%m/%Y")).pivot(
+            index="Lucro_Liquido", columns="Data_Assinatura", values="Total_Antecipacao"
+        )
+        st.line_chart(grafico, x_label="Lucro líquido 1S/2025 (BRL)", y_label="Antecipação total (BRL)")
+        st.dataframe(
+            cenarios.style.format(fmt_brl, subset=["Lucro_Liquido", "Total_Basica_Final",
+                                                   "Total_Adicional_Final", "Total_Antecipacao"])
+            .format("{:0.6f}", subset=["Fator_Cap"])
+            .format("{:%d/%m/%Y}", subset=["Data_Assinatura"]),
+            use_container_width=True, hide_index=True
+        )
+        st.download_button(
+            "Baixar cenários (CSV)",
+            data=cenarios.to_csv(index=False).encode("utf-8"),
+            file_name="PLR_Cenarios.csv", mime="text/csv"
+        )
+
+# =========================
+# Lote: várias entidades em paralelo
+# =========================
+with aba_lote:
+    st.subheader("Processamento em Lote (várias entidades)")
+    st.caption(
+        "Uma base por entidade (o nome do arquivo, sem extensão, é a Entidade) e uma planilha de parâmetros "
+        "com as colunas Entidade e Lucro_Liquido (opcionais: Data_Assinatura, Compensar). "
+        "Sem Data_Assinatura/Compensar, valem os parâmetros do sidebar."
+    )
+    ups_lote = st.file_uploader("Bases das entidades", type=["csv", "xlsx", "parquet"], accept_multiple_files=True)
+    up_params = st.file_uploader("Planilha de parâmetros (CSV ou Excel)", type=["csv", "xlsx"])
+
+    if st.button("Processar lote"):
+        if not ups_lote or up_params is None:
+            st.warning("Envie as bases e a planilha de parâmetros.")
+        else:
+            try:
+                parametros = ler_parametros(up_params)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                bases_lote = {nome_entidade(u.name): (u.getvalue(), u.name) for u in ups_lote}
+                barra = st.progress(0.0, text="Processando entidades...")
+
+                def progresso(feitos, total, r):
+                    barra.progress(feitos / total, text=f"{feitos}/{total} – {r['entidade']}: {r['status']}")
+
+                resultados = processar_lote(bases_lote, parametros, data_assinatura_cct, compensar_planos_proprios,
+                                            dedup_toggle, ao_concluir=progresso)
+                st.session_state.lote = {
+                    "resultados": resultados,
+                    "chave": hash_params(tuple(hash_bytes(b) for b, _ in bases_lote.values()),
+                                         hash_bytes(up_params.getvalue()), data_assinatura_cct,
+                                         compensar_planos_proprios, dedup_toggle),
+                }
+
+    if "lote" in st.session_state:
+        resultados_lote = st.session_state.lote["resultados"]
+        resumo_df = resumo_lote(resultados_lote)
+        erros = resumo_df[resumo_df["Status"] != "ok"]
+        if not erros.empty:
+            st.warning(f"{len(erros)} entidade(s) com erro – as demais foram processadas normalmente.")
+        st.metric("Antecipação Total consolidada", fmt_brl(resumo_df["Total_Antecipacao"].sum()))
+        st.dataframe(
+            resumo_df.style.format(fmt_brl, subset=["Total_Basica_Final", "Total_Adicional_Final", "Total_Antecipacao"]),
+            use_container_width=True, hide_index=True
+        )
+        chave_lote = st.session_state.lote["chave"]
+        st.download_button(
+            "Baixar Excel consolidado",
+            data=lambda: CACHES["exportacoes"].get_or_compute(
+                (chave_lote, "lote_xlsx"),
+                lambda: to_excel_bytes(planilhas_lote(resultados_lote), casas=2, casas_por_coluna=CASAS_LOTE)
+            ),
+            file_name=f"PLR_Consolidado_{ano_ref}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+# =========================
+# Diagnóstico do cache
+# =========================
+with st.sidebar.expander("Cache (diagnóstico)"):
+    st.write({nome: cache.stats() for nome, cache in CACHES.items()})
+    if st.button("Limpar cache"):
+        for cache in CACHES.values():
+            cache.clear()
@@ -0,0 +1,105 @@
+# plr_cache.py – cache por conteúdo (hash) para bases lidas, resultados e exportações
+# Cada rerun do Streamlit refaz o script inteiro; com o cache, entradas iguais
+# (mesmos bytes, mesma base, mesmos parâmetros) devolvem o resultado já calculado.
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# Chaves (impressões digitais)
+# =========================
+def hash_bytes(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def hash_params(*params) -> str:
+    return hashlib.blake2b(repr(params).encode("utf-8"), digest_size=16).hexdigest()
+
+def tamanho_aproximado(obj) -> int:
+    """Bytes ocupados por um valor do cache (DataFrames, bytes e tuplas/dicts destes)."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, (tuple, list)):
+        return sum(tamanho_aproximado(o) for o in obj)
+    if isinstance(obj, dict):
+        return sum(tamanho_aproximado(v) for v in obj.values())
+    return sys.getsizeof(obj)
+
+# =========================
+# Cache LRU limitado por bytes
+# =========================
+class CacheLRU:
+    """
+    Cache LRU limitado pelo tamanho total (em bytes) dos valores guardados.
+    Os valores devolvidos são compartilhados: quem os usa não deve alterá-los in-place.
+    """
+
+    def __init__(self, nome: str, max_bytes: int):
+        self.nome = nome
+        self.max_bytes = int(max_bytes)
+        self._itens = OrderedDict()   # chave -> (valor, tamanho)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, chave, default=None):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.misses += 1
+                return default
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return item[0]
+
+    def put(self, chave, valor) -> None:
+        tamanho = tamanho_aproximado(valor)
+        with self._lock:
+            if chave in self._itens:
+                self.bytes -= self._itens.pop(chave)[1]
+            if tamanho > self.max_bytes:
+                return  # maior que o cache inteiro: não guarda
+            self._itens[chave] = (valor, tamanho)
+            self.bytes += tamanho
+            while self.bytes > self.max_bytes:
+                _, (_, t) = self._itens.popitem(last=False)
+                self.bytes -= t
+                self.evictions += 1
+
+    def get_or_compute(self, chave, func, *args, **kwargs):
+        valor = self.get(chave, _AUSENTE)
+        if valor is _AUSENTE:
+            valor = func(*args, **kwargs)
+            self.put(chave, valor)
+        return valor
+
+    def clear(self) -> None:
+        with self._lock:
+            self._itens.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "itens": len(self._itens),
+            "MB": round(self.bytes / 1e6, 2),
+            "limite_MB": round(self.max_bytes / 1e6, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": round(self.hits / total, 3) if total else 0.0,
+            "evictions": self.evictions,
+        }
+
+_AUSENTE = object()
@@ -0,0 +1,88 @@
+# plr_cenarios.py – simulação de cenários (sensibilidade a lucro e data de assinatura)
+# Elegibilidade é avaliada uma vez por data de assinatura; o teto global e o pool
+# adicional são resolvidos para todos os valores de lucro de uma vez, por ordenação
+# e somas acumuladas, sem refazer a apuração linha a linha por cenário.
+
+import numpy as np
+import pandas as pd
+
+from plr_engine import (
+    PCT_LUCRO_BASICA, PCT_LUCRO_ADIC, LIMITE_ADIC_INDIV,
+    ensure_required_columns, deduplicar_matricula, calcular_elegibilidade, calcular_basica_individual,
+)
+
+def _soma_min(limiares: np.ndarray, pesos: np.ndarray, tetos: np.ndarray, niveis: np.ndarray) -> np.ndarray:
+    """
+    Para cada nível `a`, soma sobre as linhas de min(a * peso_i, teto_i), sendo
+    limiares_i = teto_i / peso_i o nível a partir do qual a linha fica no teto.
+    O(n log n + k log n) para k níveis.
+    """
+    ordem = np.argsort(limiares, kind="stable")
+    lim = limiares[ordem]
+    acum_tetos = np.concatenate([[0.0], np.cumsum(tetos[ordem])])
+    acum_pesos = np.concatenate([[0.0], np.cumsum(pesos[ordem])])
+    k = np.searchsorted(lim, niveis, side="left")   # linhas [0, k) já estão no teto
+    return acum_tetos[k] + niveis * (acum_pesos[-1] - acum_pesos[k])
+
+def _soma_positiva(cap: np.ndarray, pagos: np.ndarray, fatores: np.ndarray) -> np.ndarray:
+    """Para cada fator f, soma sobre as linhas de max(f * cap_i - pagos_i, 0) (compensação)."""
+    com_cap = cap > 0
+    cap, pagos = cap[com_cap], pagos[com_cap]
+    limiares = pagos / cap            # a linha só tem saldo com f > pagos/cap
+    ordem = np.argsort(limiares, kind="stable")
+    lim = limiares[ordem]
+    acum_cap = np.concatenate([[0.0], np.cumsum(cap[ordem])])
+    acum_pagos = np.concatenate([[0.0], np.cumsum(pagos[ordem])])
+    k = np.searchsorted(lim, fatores, side="left")  # linhas [0, k) têm saldo positivo
+    return fatores * acum_cap[k] - acum_pagos[k]
+
+def simular_cenarios(base: pd.DataFrame, lucros, datas_assinatura,
+                     compensar_planos_proprios: bool = False) -> pd.DataFrame:
+    """
+    Totais da antecipação para cada combinação (data de assinatura × lucro líquido).
+    Mesmas regras de `calcular_antecipacao`, só os totais por cenário.
+    """
+    base = deduplicar_matricula(ensure_required_columns(base))
+    lucros = np.asarray(list(lucros), dtype=float)
+    salario = base["Salario"].astype(float)
+    pagos_todos = base["Valor_Pago_2025"].astype(float).fillna(0.0).to_numpy()
+
+    linhas = []
+    for data in datas_assinatura:
+        prop = calcular_elegibilidade(base, data)["Proporcionalidade"].to_numpy()
+        eleg = prop > 0
+        indiv = calcular_basica_individual(pd.DataFrame({"Salario": salario, "Proporcionalidade": prop}))
+        cap = indiv["Basica_Indiv_Cap"].to_numpy()[eleg]
+        prop_e = prop[eleg]
+        pagos = pagos_todos[eleg]
+
+        # Regra Básica: teto global de 12,8% vira um fator por cenário
+        total_pre_cap = float(cap.sum())
+        limite_global = PCT_LUCRO_BASICA * lucros
+        fator = np.ones_like(lucros)
+        reduz = (limite_global > 0) & (total_pre_cap > limite_global)
+        fator[reduz] = limite_global[reduz] / total_pre_cap
+        if compensar_planos_proprios:
+            basica = _soma_positiva(cap, pagos, fator)
+        else:
+            basica = total_pre_cap * fator
+
+        # Parcela Adicional: min(pool * prop/soma, teto * prop) para todos os pools de uma vez
+        soma_props = float(prop_e.sum())
+        pool = PCT_LUCRO_ADIC * lucros
+        if soma_props > 0:
+            tetos = LIMITE_ADIC_INDIV * np.clip(prop_e, 0.0, 1.0)
+            adicional = _soma_min(tetos / prop_e, prop_e, tetos, pool / soma_props)
+        else:
+            adicional = np.zeros_like(lucros)
+
+        linhas.append(pd.DataFrame({
+            "Data_Assinatura": pd.Timestamp(data),
+            "Lucro_Liquido": lucros,
+            "N_Elegiveis": int(eleg.sum()),
+            "Fator_Cap": fator,
+            "Total_Basica_Final": basica,
+            "Total_Adicional_Final": adicional,
+            "Total_Antecipacao": basica + adicional,
+        }))
+    return pd.concat(linhas, ignore_index=True)
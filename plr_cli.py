@@ -0,0 +1,85 @@
+# plr_cli.py – apuração da Antecipação PLR 2025 em lote, sem Streamlit
+#
+# Exemplo:
+#   python plr_cli.py base.csv --lucro 150000000 --assinatura 2025-09-01 --compensar -o PLR_Antecipacao_2025.xlsx
+
+import argparse
+import logging
+import os
+import sys
+
+import pandas as pd
+
+from plr_engine import calcular_antecipacao, colunas_vazias, deduplicar_matricula, ensure_required_columns, fmt_brl
+from plr_io import LINHAS_POR_BLOCO, ler_base, ler_csv_em_blocos, salvar_resultado
+from plr_metricas import Medidor
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Calculadora de PLR – Antecipação 2025 (modo em lote).")
+    p.add_argument("base", help="Arquivo da base (.csv, .xlsx ou .parquet)")
+    p.add_argument("--lucro", type=float, required=True, help="Lucro líquido 1º semestre/2025 (BRL)")
+    p.add_argument("--assinatura", default="2025-09-01", help="Data de assinatura da CCT (AAAA-MM-DD)")
+    p.add_argument("--compensar", action="store_true", help="Compensar valores já pagos em 2025 (Regra Básica)")
+    p.add_argument("--redistribuir", action="store_true",
+                   help="Quando o teto global limita a Regra Básica, repartir o limite até os tetos individuais "
+                        "em vez de aplicar um fator único (a Parcela Adicional não muda)")
+    p.add_argument("--manter-duplicatas", action="store_true", help="Não remover duplicatas por Matrícula")
+    p.add_argument("--linhas-por-bloco", type=int, default=LINHAS_POR_BLOCO,
+                   help="Linhas lidas por bloco em arquivos CSV (limita o pico de memória)")
+    p.add_argument("--formato-data", default=None,
+                   help="Formato das datas no CSV (ex.: %%d/%%m/%%Y); padrão: detectado nas primeiras linhas preenchidas")
+    p.add_argument("--metricas", action="store_true",
+                   help="Registra tempo, linhas e memória de cada etapa (uma linha JSON por etapa, em stderr)")
+    p.add_argument("-o", "--saida", default="PLR_Antecipacao_2025.xlsx", help="Arquivo de saída (.xlsx, .zip, .csv ou .parquet)")
+    return p.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    data_assinatura = pd.to_datetime(args.assinatura).date()
+    if args.metricas:
+        logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+    medidor = Medidor(ativo=False, registrar_log=args.metricas,
+                      contexto={"origem": "cli", "base": os.path.basename(args.base)})
+
+    with medidor.etapa("leitura") as e:
+        if args.base.lower().endswith(".csv"):
+            base, relatorio = ler_csv_em_blocos(args.base, args.linhas_por_bloco, args.formato_data)
+            invalidos = {k: v for k, v in relatorio.items() if k.endswith(("_invalida", "_invalido")) and v}
+            if invalidos:
+                print(f"Aviso: valores que não puderam ser convertidos: {invalidos}", file=sys.stderr)
+        else:
+            base = ensure_required_columns(ler_base(args.base))
+        e.df = base
+    if not args.manter_duplicatas:
+        with medidor.etapa("deduplicacao") as e:
+            base = e.df = deduplicar_matricula(base)
+    if base.empty:
+        print("Base vazia – nada a apurar.", file=sys.stderr)
+        return 1
+    faltantes = colunas_vazias(base)
+    if faltantes:
+        print(f"Aviso: estas colunas estão vazias na base: {faltantes}.", file=sys.stderr)
+
+    base_calc, resumo = calcular_antecipacao(base, args.lucro, data_assinatura, args.compensar, medidor=medidor,
+                                             redistribuir=args.redistribuir)
+    if resumo["n_elegiveis"] == 0:
+        print("Aviso: nenhum colaborador elegível pelas regras (caput/§§).", file=sys.stderr)
+    with medidor.etapa("exportacao"):
+        salvar_resultado(base_calc, args.saida)
+
+    print(f"Elegíveis: {resumo['n_elegiveis']}")
+    print(f"Total Regra Básica (após cap): {fmt_brl(base_calc['Basica_Final'].sum())}")
+    print(f"Total Parcela Adicional (pós cap indiv.): {fmt_brl(base_calc['Adicional_Final'].sum())}")
+    print(f"Antecipação Total: {fmt_brl(base_calc['PLR_Antecipacao_Total'].sum())}")
+    if resumo["redistribuir"] and resumo["fator_cap"] < 1.0:
+        print(f"Fator de Redução (Básica): não aplicado ({resumo['fator_cap']:0.6f}) – "
+              "teto global repartido até os tetos individuais")
+    else:
+        print(f"Fator de Redução Aplicado (Básica): {resumo['fator_cap']:0.6f}")
+    print(f"Não distribuído – Regra Básica: {fmt_brl(resumo['sobra_basica'])}; "
+          f"Parcela Adicional: {fmt_brl(resumo['sobra_adicional'])}")
+    print(f"Resultado gravado em {args.saida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,626 @@
+# plr_engine.py – motor de cálculo da Antecipação PLR 2025 (sem Streamlit)
+# Regras: caput + §1º–§4º, Regra Básica com tetos individual/global e Parcela Adicional
+# com teto individual proporcional aos meses/12. Só depende de pandas/NumPy (e de plr_metricas).
+#
+# Uso como biblioteca: from plr_engine import calcular_antecipacao
+# Uso em lote: python plr_cli.py --help
+
+import pandas as pd
+import numpy as np
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+
+from plr_metricas import Medidor, MEDIDOR_DESLIGADO
+
+# =========================
+# Colunas e defaults globais
+# =========================
+REQUIRED_COLS = [
+    "Matricula", "Nome", "Cargo",
+    "Salario",
+    "Data_Admissao", "Data_Desligamento",
+    "Diretoria", "Centro_Custo",
+    "Valor_Pago_2025", "Motivo_Afastamento", "Conta_Ativa"
+]
+DERIVED_COLS = ["Salario_Base", "Verbas_Fixas_Salariais"]
+
+DEFAULTS = {
+    "Salario": 0.0,
+    "Data_Desligamento": None,
+    "Diretoria": "",
+    "Centro_Custo": "",
+    "Valor_Pago_2025": 0.0,
+    "Motivo_Afastamento": "nenhum",
+    "Conta_Ativa": "sim",
+}
+
+# =========================
+# Parâmetros da cláusula
+# =========================
+FIXO_BASICA = 2005.82
+LIMITE_BASICA_INDIV = 10760.26
+PCT_LUCRO_BASICA = 0.128   # 12,8%
+PCT_LUCRO_ADIC   = 0.022   # 2,2%
+LIMITE_ADIC_INDIV = 3471.13
+
+MUST_HAVE_VALUES = ["Matricula", "Nome", "Salario", "Data_Admissao"]
+
+# Dimensões de baixa cardinalidade guardadas como categoria na apuração
+CATEGORICAL_COLS = ["Cargo", "Diretoria", "Centro_Custo", "Motivo_Afastamento", "Conta_Ativa"]
+
+# Codigo_Elegibilidade (int8); o texto de Motivo_Elegibilidade só é montado para exibição/exportação
+COD_CAPUT, COD_PAR1, COD_PAR2, COD_PAR3, COD_NAO_ELEGIVEL, COD_SEM_DADOS = range(6)
+
+RESULT_COLS = [
+    "Basica_Final",
+    "Adicional_Base", "Teto_Adic_Proporcional", "Adicional_Final",
+    "Basica_Pos_Global", "Basica_Indiv_Cap", "Base_PLR_Basica"
+]
+
+# =========================
+# Helpers de formatação e normalização
+# =========================
+def fmt_brl(x) -> str:
+    try:
+        v = float(x)
+    except (TypeError, ValueError):
+        return "R$ 0,00"
+    return f"R$ {v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def fmt_inteiro(n) -> str:
+    return f"{int(n):,}".replace(",", ".")
+
+def ensure_required_columns(df: pd.DataFrame) -> pd.DataFrame:
+    # Cópia rasa: com Copy-on-Write, as colunas alteradas abaixo não afetam `df`, e as
+    # que já estão normalizadas não são copiadas (base já normalizada sai quase de graça)
+    df = df.copy(deep=False)
+    df.columns = df.columns.str.strip()
+
+    # Compat: se não vier "Salario" mas vierem as colunas antigas, somar para formar "Salario"
+    if "Salario" not in df.columns:
+        if ("Salario_Base" in df.columns) and ("Verbas_Fixas_Salariais" in df.columns):
+            df["Salario"] = pd.to_numeric(df["Salario_Base"], errors="coerce").fillna(0.0) + \
+                            pd.to_numeric(df["Verbas_Fixas_Salariais"], errors="coerce").fillna(0.0)
+        else:
+            df["Salario"] = 0.0
+
+    for col in REQUIRED_COLS:
+        if col not in df.columns:
+            df[col] = DEFAULTS.get(col, np.nan)
+
+    # Colunas já tipadas (Parquet, leitura em blocos, base já normalizada) não são reconvertidas
+    for c in ["Salario", "Valor_Pago_2025"]:
+        if not is_numeric_dtype(df[c]):
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+        if df[c].isna().any():
+            df[c] = df[c].fillna(0.0)
+    for c in ["Data_Admissao", "Data_Desligamento"]:
+        if not is_datetime64_any_dtype(df[c]):
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+
+    # Derivados a partir de "Salario"
+    df["Salario_Base"] = df["Salario"] / 1.55
+    df["Verbas_Fixas_Salariais"] = df["Salario_Base"] * 0.55
+
+    return df
+
+def compactar_base(df: pd.DataFrame) -> pd.DataFrame:
+    """Dimensões de CATEGORICAL_COLS como categoria (as que já forem categoria ficam como estão)."""
+    conv = {c: "category" for c in CATEGORICAL_COLS
+            if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype)}
+    return df.astype(conv) if conv else df
+
+def deduplicar_matricula(df: pd.DataFrame) -> pd.DataFrame:
+    """Remove duplicatas por Matrícula mantendo a última ocorrência (sem cópia se não houver)."""
+    if "Matricula" not in df.columns:
+        return df
+    repetidas = df["Matricula"].duplicated(keep="last").to_numpy()
+    if repetidas.any():
+        df = df[~repetidas]
+    return df.reset_index(drop=True)
+
+def indexar_por_matricula(df: pd.DataFrame) -> pd.DataFrame:
+    """Uma linha por Matrícula (a última), com a Matrícula como índice."""
+    if "Matricula" not in df.columns:
+        return df
+    return deduplicar_matricula(df).set_index("Matricula")
+
+def colunas_vazias(df: pd.DataFrame) -> list:
+    """Colunas obrigatórias que não têm nenhum valor preenchido."""
+    return [c for c in MUST_HAVE_VALUES if c in df.columns and df[c].isna().all()]
+
+# =========================
+# Elegibilidade 2025 (caput + §1–§4) – retorna (proporção, motivo, meses)
+# =========================
+def calcular_proporcionalidade_especial(row, data_assinatura):
+    admissao = pd.to_datetime(row.get("Data_Admissao"), errors="coerce")
+    desligamento_raw = row.get("Data_Desligamento")
+
+    if pd.isna(admissao):
+        return 0.0, "Dados insuficientes (sem Data_Admissao)", 0.0
+
+    if pd.isna(desligamento_raw) or desligamento_raw in (None, "", "nan"):
+        desligamento = None
+    else:
+        desligamento = pd.to_datetime(desligamento_raw, errors="coerce")
+        if pd.isna(desligamento):
+            desligamento = None
+
+    motivo = str(row.get("Motivo_Afastamento", "")).lower().strip()
+    if motivo == "licenca-maternidade":
+        motivo = "licença-maternidade"
+
+    assinatura = pd.to_datetime(data_assinatura)
+
+    def meses_12avos(inicio, fim):
+        """
+        Conta 1/12 por mês com fração >= 15 dias,
+        MAS o mês de admissão só conta se o dia da admissão for <= 15.
+        """
+        if pd.isna(inicio) or pd.isna(fim) or inicio > fim:
+            return 0.0
+        total = 0
+        cur = pd.Timestamp(year=inicio.year, month=inicio.month, day=1)
+        end = pd.Timestamp(year=fim.year, month=fim.month, day=1)
+        while cur <= end:
+            mes_ini = cur
+            mes_fim = (cur + pd.offsets.MonthEnd(0))
+            seg_ini = max(inicio, mes_ini)
+            seg_fim = min(fim, mes_fim)
+            dias = (seg_fim - seg_ini).days + 1
+
+            conta_mes = False
+            # Se for o mês da admissão, exige dia <= 15 para poder contar
+            if (cur.year == inicio.year) and (cur.month == inicio.month):
+                if inicio.day <= 15 and dias >= 15:
+                    conta_mes = True
+            else:
+                if dias >= 15:
+                    conta_mes = True
+
+            if conta_mes:
+                total += 1
+
+            cur = cur + pd.offsets.MonthBegin(1)
+        return min(12.0, float(total))
+
+    # §1º – admitido até 31/12/2024, afastado, ativo na assinatura → integral
+    if (admissao <= pd.Timestamp("2024-12-31")) and (motivo in ["doença", "acidente", "licença-maternidade"]) and (desligamento is None or desligamento > assinatura):
+        return 1.0, "§1º – Admitido até 31/12/2024 com afastamento coberto; ativo na assinatura (integral).", 12.0
+
+    # §2º – admitido a partir de 01/01/2025, efetivo na assinatura → proporcional até 31/12/2025
+    if (admissao >= pd.Timestamp("2025-01-01")) and (desligamento is None or desligamento > assinatura):
+        meses = meses_12avos(admissao, pd.Timestamp("2025-12-31"))
+        prop = float(meses / 12.0)
+        return prop, f"§2º – Admitido em 2025; proporcional {meses:.0f}/12 até 31/12/2025.", meses
+
+    # §3º – dispensado sem justa causa entre 02/08/2025 e a assinatura → proporcional até desligamento
+    if (desligamento is not None) and (pd.Timestamp("2025-08-02") <= desligamento <= assinatura):
+        meses = meses_12avos(admissao, desligamento)
+        prop = float(meses / 12.0)
+        return prop, f"§3º – Dispensado sem justa causa entre 02/08/2025 e assinatura; proporcional {meses:.0f}/12.", meses
+
+    # CAPUT – ativo na assinatura → integral
+    if (desligamento is None) or (desligamento > assinatura):
+        return 1.0, "Caput – Empregado ativo na data da assinatura (integral).", 12.0
+
+    # §4º – não elegível
+    return 0.0, "§4º – Não elegível.", 0.0
+
+# =========================
+# Elegibilidade vetorizada – mesmas regras, avaliadas coluna a coluna
+# =========================
+MOTIVOS_AFASTAMENTO_COBERTOS = ["doença", "acidente", "licença-maternidade"]
+_DIA = np.timedelta64(1, "D")
+
+def meses_12avos_vetorizado(inicio: pd.Series, fim: pd.Series) -> np.ndarray:
+    """
+    Versão em arrays de `meses_12avos`: conta 1/12 por mês com fração >= 15 dias,
+    e o mês de admissão só conta se o dia da admissão for <= 15.
+    """
+    ini = pd.to_datetime(inicio, errors="coerce").to_numpy(dtype="datetime64[ns]")
+    fim = pd.to_datetime(fim, errors="coerce").to_numpy(dtype="datetime64[ns]")
+    validos = ~np.isnat(ini) & ~np.isnat(fim)
+    validos[validos] = ini[validos] <= fim[validos]
+
+    mes_ini = ini.astype("datetime64[M]")
+    mes_fim = fim.astype("datetime64[M]")
+    n_meses = (mes_fim - mes_ini).astype(np.int64) + 1
+    dia_ini = (ini.astype("datetime64[D]") - mes_ini.astype("datetime64[D]")).astype(np.int64) + 1
+    dia_fim = (fim.astype("datetime64[D]") - mes_fim.astype("datetime64[D]")).astype(np.int64) + 1
+    # Último dia (meia-noite) do mês de admissão, como em MonthEnd(0)
+    ultimo_dia_ini = ((mes_ini + 1).astype("datetime64[D]") - 1).astype("datetime64[ns]")
+
+    # Mês de admissão: dias entre a admissão e o fim do segmento (fim do mês ou desligamento,
+    # limitado à meia-noite do último dia, como em min(fim, MonthEnd(0)))
+    seg_fim = np.where(n_meses == 1, np.minimum(fim, ultimo_dia_ini), ultimo_dia_ini)
+    dias_primeiro = np.floor_divide(seg_fim - ini, _DIA) + 1
+    conta_primeiro = (dia_ini <= 15) & (dias_primeiro >= 15)
+
+    # Meses intermediários sempre contam; o último (se distinto) conta com dia >= 15
+    intermediarios = np.clip(n_meses - 2, 0, None)
+    conta_ultimo = (n_meses >= 2) & (dia_fim >= 15)
+
+    total = conta_primeiro.astype(np.int64) + intermediarios + conta_ultimo.astype(np.int64)
+    total = np.where(validos, total, 0)
+    return np.minimum(12.0, total.astype(float))
+
+def calcular_elegibilidade(df: pd.DataFrame, data_assinatura) -> pd.DataFrame:
+    """
+    Equivalente vetorizado de `calcular_proporcionalidade_especial` aplicado linha a linha.
+    Retorna Proporcionalidade, Codigo_Elegibilidade (int8) e Meses_Contabilizados (int8)
+    com o índice de `df`; o texto do motivo sai de `motivos_elegibilidade`.
+    """
+    n = len(df)
+    admissao = pd.to_datetime(df["Data_Admissao"], errors="coerce") if "Data_Admissao" in df.columns \
+        else pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    desligamento = pd.to_datetime(df["Data_Desligamento"], errors="coerce") if "Data_Desligamento" in df.columns \
+        else pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    if "Motivo_Afastamento" in df.columns:
+        motivo = df["Motivo_Afastamento"]
+        if isinstance(motivo.dtype, pd.CategoricalDtype):
+            # Normaliza só as categorias e espalha pelos códigos (NaN tem código -1)
+            cobertas = _afastamento_coberto(pd.Series(motivo.cat.categories.astype(object)))
+            codigos = motivo.cat.codes.to_numpy()
+            afastado = np.append(cobertas, False)[codigos]
+        else:
+            afastado = _afastamento_coberto(motivo)
+    else:
+        afastado = np.zeros(n, dtype=bool)
+
+    assinatura = pd.to_datetime(data_assinatura)
+    sem_admissao = admissao.isna().to_numpy()
+    sem_deslig = desligamento.isna().to_numpy()
+    ativo = sem_deslig | (desligamento > assinatura).to_numpy()
+
+    # Ordem de avaliação idêntica à função linha a linha (a primeira regra que casar vence)
+    par1 = ~sem_admissao & (admissao <= pd.Timestamp("2024-12-31")).to_numpy() & afastado & ativo
+    par2 = ~sem_admissao & ~par1 & (admissao >= pd.Timestamp("2025-01-01")).to_numpy() & ativo
+    par3 = ~sem_admissao & ~par1 & ~par2 & ~sem_deslig & \
+        ((desligamento >= pd.Timestamp("2025-08-02")) & (desligamento <= assinatura)).to_numpy()
+    caput = ~sem_admissao & ~par1 & ~par2 & ~par3 & ativo
+
+    meses = np.zeros(n, dtype=float)
+    meses[par1 | caput] = 12.0
+    if par2.any():
+        meses[par2] = meses_12avos_vetorizado(admissao[par2], pd.Series(pd.Timestamp("2025-12-31"), index=admissao.index[par2]))
+    if par3.any():
+        meses[par3] = meses_12avos_vetorizado(admissao[par3], desligamento[par3])
+
+    prop = np.zeros(n, dtype=float)
+    prop[par1 | caput] = 1.0
+    prop[par2 | par3] = meses[par2 | par3] / 12.0
+
+    codigos = np.full(n, COD_NAO_ELEGIVEL, dtype=np.int8)
+    codigos[sem_admissao] = COD_SEM_DADOS
+    codigos[par1] = COD_PAR1
+    codigos[caput] = COD_CAPUT
+    codigos[par2] = COD_PAR2
+    codigos[par3] = COD_PAR3
+
+    return pd.DataFrame({
+        "Proporcionalidade": prop,
+        "Codigo_Elegibilidade": codigos,
+        "Meses_Contabilizados": meses.astype(np.int8),
+    }, index=df.index)
+
+def _afastamento_coberto(motivo: pd.Series) -> np.ndarray:
+    motivo = motivo.astype(str).str.lower().str.strip()
+    motivo = motivo.replace("licenca-maternidade", "licença-maternidade")
+    return motivo.isin(MOTIVOS_AFASTAMENTO_COBERTOS).to_numpy()
+
+def _texto_motivo(codigo: int, meses: int) -> str:
+    """Mesmos textos de `calcular_proporcionalidade_especial`."""
+    if codigo == COD_CAPUT:
+        return "Caput – Empregado ativo na data da assinatura (integral)."
+    if codigo == COD_PAR1:
+        return "§1º – Admitido até 31/12/2024 com afastamento coberto; ativo na assinatura (integral)."
+    if codigo == COD_PAR2:
+        return f"§2º – Admitido em 2025; proporcional {meses:.0f}/12 até 31/12/2025."
+    if codigo == COD_PAR3:
+        return f"§3º – Dispensado sem justa causa entre 02/08/2025 e assinatura; proporcional {meses:.0f}/12."
+    if codigo == COD_SEM_DADOS:
+        return "Dados insuficientes (sem Data_Admissao)"
+    return "§4º – Não elegível."
+
+def motivos_elegibilidade(codigos, meses) -> pd.Categorical:
+    """Texto do motivo para cada par (Codigo_Elegibilidade, Meses_Contabilizados), como categoria."""
+    chave = np.asarray(codigos, dtype=np.int16) * 13 + np.asarray(meses, dtype=np.int16)
+    unicas, inversa = np.unique(chave, return_inverse=True)
+    return pd.Categorical.from_codes(inversa.reshape(-1), [_texto_motivo(c // 13, c % 13) for c in unicas])
+
+def com_motivo_texto(df: pd.DataFrame) -> pd.DataFrame:
+    """Troca Codigo_Elegibilidade pelo texto de Motivo_Elegibilidade (para exibição e exportação)."""
+    if "Codigo_Elegibilidade" not in df.columns:
+        return df
+    out = df.rename(columns={"Codigo_Elegibilidade": "Motivo_Elegibilidade"})
+    out["Motivo_Elegibilidade"] = motivos_elegibilidade(df["Codigo_Elegibilidade"], df["Meses_Contabilizados"])
+    return out
+
+def marcar_elegivel(proporcionalidade) -> pd.Categorical:
+    """Coluna Elegivel ("Sim"/"Não") como categoria."""
+    return pd.Categorical.from_codes((np.asarray(proporcionalidade) <= 0).astype(np.int8), ["Sim", "Não"])
+
+
+# =========================
+# Apuração – Regra Básica (tetos individual/global) e Parcela Adicional
+# =========================
+def aplicar_elegibilidade(base_calc: pd.DataFrame, data_assinatura, linhas_por_bloco: int = None,
+                          progresso=None) -> pd.DataFrame:
+    """
+    Acrescenta Proporcionalidade, Codigo_Elegibilidade, Meses_Contabilizados e Elegivel.
+    Com `linhas_por_bloco`, avalia a base em blocos e chama `progresso("elegibilidade", feitas, total)`
+    após cada um.
+    """
+    n = len(base_calc)
+    if not linhas_por_bloco or n <= linhas_por_bloco:
+        eleg = calcular_elegibilidade(base_calc, data_assinatura)
+    else:
+        partes = []
+        for ini in range(0, n, linhas_por_bloco):
+            partes.append(calcular_elegibilidade(base_calc.iloc[ini:ini + linhas_por_bloco], data_assinatura))
+            _avisar(progresso, "elegibilidade", min(ini + linhas_por_bloco, n), n)
+        eleg = pd.concat(partes)
+    _avisar(progresso, "elegibilidade", n, n)
+    base_calc["Proporcionalidade"] = eleg["Proporcionalidade"]
+    base_calc["Codigo_Elegibilidade"] = eleg["Codigo_Elegibilidade"]
+    base_calc["Meses_Contabilizados"] = eleg["Meses_Contabilizados"]
+    base_calc["Elegivel"] = marcar_elegivel(eleg["Proporcionalidade"])
+    return base_calc
+
+def calcular_basica_individual(df: pd.DataFrame) -> pd.DataFrame:
+    """Regra Básica por linha (antes do teto global): Base_PLR_Basica e Basica_Indiv_Cap."""
+    # Regra Básica: 54% * Salario + FIXO, vezes proporcionalidade
+    df["Base_PLR_Basica"] = (0.54 * df["Salario"].astype(float) + FIXO_BASICA) * df["Proporcionalidade"]
+
+    # Cap individual (Básica)
+    df["Basica_Indiv_Cap"] = df["Base_PLR_Basica"].clip(upper=LIMITE_BASICA_INDIV)
+    return df
+
+def distribuir_com_tetos(total: float, pesos, tetos):
+    """
+    Divide `total` proporcionalmente a `pesos` sem passar de `tetos`: o que uma linha não pode
+    receber vai para as que seguem abaixo do teto, até esgotar o total ou todas chegarem ao teto
+    (nível de água). Retorna (valores, sobra); sobra > 0 só quando todas estão no teto.
+
+    Em vez de repassar o excedente até estabilizar, ordena as linhas pelo nível em que cada uma
+    atinge o teto (teto/peso) e acha o nível final por somas acumuladas – O(n log n).
+    Linhas com peso <= 0 recebem 0.
+    """
+    pesos = np.asarray(pesos, dtype=float)
+    valores = np.zeros(len(pesos))
+    ativos = pesos > 0
+    p = pesos[ativos]
+    t = np.clip(np.asarray(tetos, dtype=float)[ativos], 0.0, None)
+    total = float(total)
+    soma_tetos = float(t.sum())
+    if total <= 0:
+        return valores, 0.0
+    if total >= soma_tetos:
+        valores[ativos] = t
+        return valores, total - soma_tetos
+
+    limiares = t / p
+    ordem = np.argsort(limiares, kind="stable")
+    lim = limiares[ordem]
+    acum_tetos = np.concatenate([[0.0], np.cumsum(t[ordem])])
+    acum_pesos = np.concatenate([[0.0], np.cumsum(p[ordem])])
+    # Total distribuído se o nível parar em lim[k]: linhas [0, k) no teto, as demais em lim[k] * peso
+    distribuido = acum_tetos[:-1] + lim * (acum_pesos[-1] - acum_pesos[:-1])
+    k = int(np.searchsorted(distribuido, total, side="left"))
+    nivel = (total - acum_tetos[k]) / (acum_pesos[-1] - acum_pesos[k])
+    valores[ativos] = np.minimum(nivel * p, t)
+    return valores, 0.0
+
+def aplicar_tetos(elegiveis: pd.DataFrame, lucro_liquido, compensar_planos_proprios: bool,
+                  totais: tuple = None, redistribuir: bool = False) -> dict:
+    """
+    Calcula, sobre os elegíveis, a Regra Básica (teto individual e global de 12,8%)
+    e a Parcela Adicional (pool de 2,2% com teto individual proporcional).
+    Escreve as colunas de RESULT_COLS em `elegiveis` e retorna os valores de verificação,
+    inclusive o que ficou sem distribuir de cada pool (sobra_basica, sobra_adicional).
+
+    `totais` = (soma de Basica_Indiv_Cap, soma de Proporcionalidade) já conhecidos
+    (ex.: mantidos por delta na apuração incremental); nesse caso Base_PLR_Basica e
+    Basica_Indiv_Cap já devem estar em `elegiveis` e as somas não são refeitas.
+
+    Com `redistribuir=True`, quando o teto global limita a Básica, ele é repartido por
+    `distribuir_com_tetos` proporcionalmente a Base_PLR_Basica até Basica_Indiv_Cap (em vez do
+    fator único; fator_cap fica só como referência). A Adicional não muda: o teto individual
+    (LIMITE_ADIC_INDIV × Proporcionalidade) é proporcional ao próprio rateio, então ou todos
+    ficam abaixo dele ou todos o atingem – não há excedente para repassar.
+    """
+    if totais is None:
+        calcular_basica_individual(elegiveis)
+        totais = (float(elegiveis["Basica_Indiv_Cap"].sum()), float(elegiveis["Proporcionalidade"].sum()))
+    total_basica_pre_cap, soma_props = totais
+
+    # Cap global 12,8% do lucro 1S/2025 (Básica)
+    limite_global_basica = PCT_LUCRO_BASICA * float(lucro_liquido)
+    fator_cap = 1.0
+    if limite_global_basica > 0 and total_basica_pre_cap > limite_global_basica:
+        fator_cap = limite_global_basica / total_basica_pre_cap
+    if redistribuir and fator_cap < 1.0:
+        elegiveis["Basica_Pos_Global"], _ = distribuir_com_tetos(
+            limite_global_basica, elegiveis["Base_PLR_Basica"], elegiveis["Basica_Indiv_Cap"])
+    else:
+        elegiveis["Basica_Pos_Global"] = elegiveis["Basica_Indiv_Cap"] * fator_cap
+    sobra_basica = max(limite_global_basica - total_basica_pre_cap, 0.0)
+
+    # Compensação (Básica)
+    if compensar_planos_proprios:
+        pagos = elegiveis["Valor_Pago_2025"].astype(float).fillna(0.0)
+        elegiveis["Basica_Final"] = (elegiveis["Basica_Pos_Global"] - pagos).clip(lower=0.0)
+    else:
+        elegiveis["Basica_Final"] = elegiveis["Basica_Pos_Global"]
+
+    # Parcela Adicional – proporcional aos meses (Proporcionalidade) + teto individual proporcional
+    pool_adic = PCT_LUCRO_ADIC * float(lucro_liquido)
+    if soma_props > 0:
+        elegiveis["Adicional_Base"] = pool_adic * (elegiveis["Proporcionalidade"] / soma_props)
+    else:
+        elegiveis["Adicional_Base"] = 0.0
+
+    # Teto individual proporcional: 3.471,13 * Proporcionalidade
+    elegiveis["Teto_Adic_Proporcional"] = LIMITE_ADIC_INDIV * elegiveis["Proporcionalidade"].clip(lower=0.0, upper=1.0)
+    elegiveis["Adicional_Final"] = np.minimum(elegiveis["Adicional_Base"], elegiveis["Teto_Adic_Proporcional"])
+    sobra_adicional = max(pool_adic - float(elegiveis["Adicional_Final"].sum()), 0.0)
+
+    return {
+        "limite_global_basica": limite_global_basica,
+        "total_basica_pre_cap": total_basica_pre_cap,
+        "fator_cap": fator_cap,
+        "sobra_basica": sobra_basica,
+        "pool_adic": pool_adic,
+        "soma_props": soma_props,
+        "sobra_adicional": sobra_adicional,
+        "redistribuir": redistribuir,
+    }
+
+def calcular_antecipacao(base: pd.DataFrame, lucro_liquido, data_assinatura,
+                         compensar_planos_proprios: bool = False, medidor: Medidor = None,
+                         progresso=None, linhas_por_bloco: int = None, redistribuir: bool = False):
+    """
+    Apuração completa da antecipação para uma base já carregada.
+    Retorna (base_calc, resumo): uma linha por Matrícula com as colunas de resultado
+    e PLR_Antecipacao_Total, e o dicionário de verificações (n_elegiveis, fator_cap, ...).
+    Sem elegíveis, as colunas de resultado ficam zeradas e resumo["n_elegiveis"] == 0.
+    Com `medidor`, cada etapa (normalização, deduplicação, elegibilidade, tetos) é medida;
+    `progresso(etapa, linhas_feitas, total)` é chamado ao fim de cada etapa (e de cada bloco de
+    `linhas_por_bloco` na elegibilidade) – se levantar uma exceção, a apuração é interrompida.
+    `redistribuir` é repassado a `aplicar_tetos`.
+
+    Um único quadro indexado por Matrícula atravessa todas as etapas: deduplicação uma vez,
+    colunas escritas no próprio quadro (sem cópia dos elegíveis e sem merge de volta).
+    """
+    medidor = medidor or MEDIDOR_DESLIGADO
+
+    n = len(base)
+
+    with medidor.etapa("normalizacao") as e:
+        base_calc = e.df = compactar_base(ensure_required_columns(base))
+    _avisar(progresso, "normalizacao", n, n)
+
+    with medidor.etapa("deduplicacao") as e:
+        base_calc = e.df = indexar_por_matricula(base_calc)
+    _avisar(progresso, "deduplicacao", n, n)
+
+    # Proporcionalidade (caput + parágrafos)
+    with medidor.etapa("elegibilidade") as e:
+        e.df = aplicar_elegibilidade(base_calc, data_assinatura, linhas_por_bloco, progresso)
+
+    # Não elegíveis têm Proporcionalidade 0: todas as colunas de RESULT_COLS saem 0 para eles
+    with medidor.etapa("tetos") as e:
+        resumo = aplicar_tetos(base_calc, lucro_liquido, compensar_planos_proprios, redistribuir=redistribuir)
+        resumo["n_elegiveis"] = int((base_calc["Proporcionalidade"].to_numpy() > 0).sum())
+        base_calc = e.df = finalizar_resultado(base_calc)
+    _avisar(progresso, "tetos", len(base_calc), len(base_calc))
+    return base_calc, resumo
+
+def _avisar(progresso, etapa: str, feitas: int, total: int) -> None:
+    if progresso is not None:
+        progresso(etapa, feitas, total)
+
+def finalizar_resultado(base_calc: pd.DataFrame) -> pd.DataFrame:
+    """PLR_Antecipacao_Total, colunas de RESULT_COLS ao final e Matrícula de volta como coluna."""
+    base_calc["PLR_Antecipacao_Total"] = base_calc["Basica_Final"] + base_calc["Adicional_Final"]
+    finais = RESULT_COLS + ["PLR_Antecipacao_Total"]
+    base_calc = base_calc[[c for c in base_calc.columns if c not in finais] + finais]
+    return base_calc.reset_index() if base_calc.index.name == "Matricula" else base_calc
+
+# =========================
+# Totais – cubo Diretoria × Centro_Custo × Cargo
+# =========================
+DIMENSOES_CUBO = ["Diretoria", "Centro_Custo", "Cargo"]
+MEDIDAS_CUBO = ["Basica_Final", "Adicional_Final", "PLR_Antecipacao_Total"]
+ROTULO_TOTAL = "(total)"
+
+def calcular_cubo(base_calc: pd.DataFrame) -> pd.DataFrame:
+    """
+    Totais no nível mais fino (Diretoria × Centro_Custo × Cargo): Colaboradores, Elegiveis e as
+    somas de MEDIDAS_CUBO, com as dimensões no índice. É a única leitura da base; os demais
+    níveis saem de `totais_por`/`cubo_com_subtotais`, que só somam o cubo. Dimensão vazia vira "".
+    """
+    chaves = [base_calc[c] if c in base_calc.columns else pd.Series("", index=base_calc.index, name=c)
+              for c in DIMENSOES_CUBO]
+    # Elegiveis entra como coluna booleana: a mesma agregação soma tudo numa passada
+    medidas = base_calc[MEDIDAS_CUBO].assign(Elegiveis=base_calc["Proporcionalidade"].to_numpy() > 0)
+    grupos = medidas.groupby(chaves, observed=True, dropna=False)
+    cubo = grupos.sum()
+    cubo.insert(0, "Colaboradores", grupos.size().to_numpy())
+    cubo = cubo[["Colaboradores", "Elegiveis"] + MEDIDAS_CUBO]
+
+    # Índice pequeno (um item por combinação): rótulos em texto, vazio/NaN juntos em ""
+    cubo.index = pd.MultiIndex.from_arrays(
+        [pd.Index(cubo.index.get_level_values(c)).astype(object).fillna("").astype(str) for c in DIMENSOES_CUBO],
+        names=DIMENSOES_CUBO,
+    )
+    return cubo.groupby(level=DIMENSOES_CUBO, sort=True).sum()
+
+def totais_por(cubo: pd.DataFrame, dimensoes: list) -> pd.DataFrame:
+    """Totais agrupados por `dimensoes` (subconjunto de DIMENSOES_CUBO, em qualquer ordem); [] = total geral."""
+    if not dimensoes:
+        return cubo.sum().to_frame().T.astype(cubo.dtypes.to_dict())
+    return cubo.groupby(level=list(dimensoes), sort=True).sum().reset_index()
+
+def dimensoes_preenchidas(cubo: pd.DataFrame) -> list:
+    """Dimensões com pelo menos um valor não vazio na base."""
+    return [c for c in DIMENSOES_CUBO if (cubo.index.get_level_values(c) != "").any()]
+
+def cubo_com_subtotais(cubo: pd.DataFrame) -> pd.DataFrame:
+    """
+    O cubo em formato de relatório: total geral, subtotal por Diretoria, por Diretoria ×
+    Centro_Custo e as linhas de Cargo, cada subtotal antes das linhas que resume.
+    A coluna Nivel indica quantas dimensões a linha detalha (0 = total geral).
+    """
+    partes = []
+    for nivel in range(len(DIMENSOES_CUBO) + 1):
+        parte = totais_por(cubo, DIMENSOES_CUBO[:nivel])
+        for c in DIMENSOES_CUBO[nivel:]:
+            parte[c] = None
+        parte.insert(0, "Nivel", nivel)
+        partes.append(parte)
+    rel = pd.concat(partes, ignore_index=True)
+    rel = rel.sort_values(DIMENSOES_CUBO + ["Nivel"], na_position="first", kind="stable", ignore_index=True)
+    rel[DIMENSOES_CUBO] = rel[DIMENSOES_CUBO].fillna(ROTULO_TOTAL)
+    return rel[["Nivel"] + DIMENSOES_CUBO + [c for c in cubo.columns]]
+
+# =========================
+# Visualização – filtro, ordenação e paginação no servidor
+# =========================
+MONEY_COLS = [
+    "Salario", "Base_PLR_Basica", "Basica_Indiv_Cap", "Basica_Pos_Global", "Basica_Final",
+    "Adicional_Base", "Teto_Adic_Proporcional", "Adicional_Final", "PLR_Antecipacao_Total"
+]
+
+def paginar(df: pd.DataFrame, filtros: dict = None, ordenar_por: str = None, crescente: bool = True,
+            pagina: int = 1, tamanho_pagina: int = 100, colunas: list = None):
+    """
+    Recorte visível de `df`: aplica `filtros` ({coluna: valores aceitos}; vazio = sem filtro),
+    ordena por `ordenar_por` e devolve só a página pedida, nas `colunas` pedidas.
+    "Motivo_Elegibilidade" ordena pelo texto do motivo (montado só para as linhas filtradas).
+    Só as posições são ordenadas; a cópia feita é a da página. Retorna (pagina_df, n_filtradas).
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for col, valores in (filtros or {}).items():
+        if valores and col in df.columns:
+            mask &= df[col].isin(valores).to_numpy()
+    pos = np.flatnonzero(mask)
+
+    chaves = None
+    if ordenar_por and ordenar_por in df.columns and len(pos):
+        chaves = df[ordenar_por].iloc[pos].reset_index(drop=True)
+    elif ordenar_por == "Motivo_Elegibilidade" and "Codigo_Elegibilidade" in df.columns and len(pos):
+        chaves = pd.Series(motivos_elegibilidade(df["Codigo_Elegibilidade"].to_numpy()[pos],
+                                                 df["Meses_Contabilizados"].to_numpy()[pos]))
+    if chaves is not None:
+        if isinstance(chaves.dtype, pd.CategoricalDtype):
+            # Categorias na ordem alfabética: a ordenação pelos códigos fica igual à do texto
+            chaves = chaves.cat.reorder_categories(chaves.cat.categories.sort_values())
+        ordem = chaves.sort_values(ascending=crescente, na_position="last", kind="stable").index.to_numpy()
+        pos = pos[ordem]
+
+    ini = max(0, (int(pagina) - 1) * int(tamanho_pagina))
+    recorte = df.iloc[pos[ini:ini + int(tamanho_pagina)]]
+    if colunas is not None:
+        recorte = recorte[colunas]
+    return recorte, len(pos)
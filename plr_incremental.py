@@ -0,0 +1,120 @@
+# plr_incremental.py – apuração incremental para a base do cadastro manual
+# Guarda a base normalizada e as colunas calculadas por Matrícula e, a cada edição, só
+# reavalia as Matrículas que o cadastro (plr_store.BaseManual) informa como gravadas ou
+# removidas; as somas de que os tetos dependem são mantidas por delta.
+
+import numpy as np
+import pandas as pd
+
+from plr_engine import (
+    REQUIRED_COLS, CATEGORICAL_COLS,
+    compactar_base, ensure_required_columns, indexar_por_matricula, aplicar_elegibilidade,
+    calcular_basica_individual, aplicar_tetos, finalizar_resultado,
+)
+
+class ApuracaoIncremental:
+    """
+    Estado da apuração do cadastro manual, indexado por Matrícula: base normalizada,
+    elegibilidade e Regra Básica individual de cada linha.
+
+    `sincronizar(base_manual, data_assinatura)` pede ao cadastro as linhas das Matrículas mudadas
+    desde a sincronização anterior (`BaseManual.ler_desde`) e reavalia só elas;
+    a primeira chamada, uma nova data de assinatura ou um histórico que o cadastro já não tem
+    (ex.: cadastro apagado) recarregam tudo. `resultado(lucro, compensar)` aplica os tetos
+    usando as somas mantidas por delta. Linhas reavaliadas vão para o fim do quadro.
+    `impressao` é a versão do cadastro que o estado reflete (chave de cache do resultado).
+    """
+
+    def __init__(self):
+        self.data_assinatura = None
+        self._linhas = None     # base normalizada + colunas calculadas, índice = Matricula
+        self._impressao = None  # BaseManual.impressao() da última sincronização
+        self.total_basica_pre_cap = 0.0
+        self.soma_props = 0.0
+        self.n_elegiveis = 0
+        self.ultima_atualizacao = {"novas": 0, "alteradas": 0, "removidas": 0}
+
+    @property
+    def impressao(self):
+        """BaseManual.impressao() da versão sincronizada (None antes da primeira sincronização)."""
+        return self._impressao
+
+    def _somar(self, linhas: pd.DataFrame, sinal: float) -> None:
+        eleg = linhas["Proporcionalidade"].to_numpy() > 0
+        self.total_basica_pre_cap += sinal * float(linhas["Basica_Indiv_Cap"].to_numpy()[eleg].sum())
+        self.soma_props += sinal * float(linhas["Proporcionalidade"].to_numpy()[eleg].sum())
+        self.n_elegiveis += int(sinal) * int(eleg.sum())
+
+    def _preparar(self, base: pd.DataFrame) -> pd.DataFrame:
+        """Mesmas etapas de `calcular_antecipacao` até a Regra Básica individual."""
+        linhas = indexar_por_matricula(compactar_base(ensure_required_columns(base)))
+        aplicar_elegibilidade(linhas, self.data_assinatura)
+        return calcular_basica_individual(linhas)
+
+    def sincronizar(self, base_manual, data_assinatura) -> dict:
+        """Traz o estado para a versão atual do cadastro; retorna quantas linhas foram novas/alteradas/removidas."""
+        anterior = self._impressao if self._linhas is not None and data_assinatura == self.data_assinatura else None
+        linhas, mudadas, impressao = base_manual.ler_desde(anterior)
+        self.data_assinatura = data_assinatura
+
+        if mudadas is None:
+            self._linhas = self._preparar(linhas)
+            self.total_basica_pre_cap, self.soma_props, self.n_elegiveis = 0.0, 0.0, 0
+            self._somar(self._linhas, 1.0)
+            self.ultima_atualizacao = {"novas": len(self._linhas), "alteradas": 0, "removidas": 0}
+        elif mudadas:
+            self._aplicar(self._preparar(linhas), mudadas)
+        else:
+            self.ultima_atualizacao = {"novas": 0, "alteradas": 0, "removidas": 0}
+        self._impressao = impressao
+        return self.ultima_atualizacao
+
+    def _aplicar(self, calculadas: pd.DataFrame, mudadas: set) -> None:
+        """Troca as linhas de `mudadas` pelas `calculadas` (as ausentes delas foram removidas do cadastro)."""
+        anteriores = self._linhas
+        pos = anteriores.index.get_indexer(list(mudadas))
+        saindo = pos[pos >= 0]
+        if len(saindo):
+            self._somar(anteriores.iloc[saindo], -1.0)
+        self._somar(calculadas, 1.0)
+
+        existiam = anteriores.index[saindo]
+        self.ultima_atualizacao = {
+            "novas": int((~calculadas.index.isin(existiam)).sum()),
+            "alteradas": int(calculadas.index.isin(existiam).sum()),
+            "removidas": int((~existiam.isin(calculadas.index)).sum()),
+        }
+
+        mantidas = anteriores
+        if len(saindo):
+            manter = np.ones(len(anteriores), dtype=bool)
+            manter[saindo] = False
+            mantidas = anteriores[manter]
+        if mantidas.empty:
+            self._linhas = calculadas
+            return
+        # Categorias novas entram no quadro guardado (só a lista de categorias muda) para o concat
+        # manter as dimensões como categoria
+        for c in CATEGORICAL_COLS:
+            if c in mantidas.columns and isinstance(mantidas[c].dtype, pd.CategoricalDtype):
+                novas = calculadas[c].dropna().unique()
+                faltam = pd.Index(novas).difference(mantidas[c].cat.categories)
+                if len(faltam):
+                    mantidas[c] = mantidas[c].cat.add_categories(faltam)
+                calculadas[c] = calculadas[c].astype(mantidas[c].dtype)
+        self._linhas = pd.concat([mantidas, calculadas])
+
+    def base(self) -> pd.DataFrame:
+        """Base normalizada (colunas de REQUIRED_COLS, Matrícula como coluna)."""
+        if self._linhas is None:
+            return ensure_required_columns(pd.DataFrame(columns=REQUIRED_COLS))
+        return self._linhas.reset_index()[REQUIRED_COLS]
+
+    def resultado(self, lucro_liquido, compensar_planos_proprios: bool = False, redistribuir: bool = False):
+        """Mesmo retorno de `calcular_antecipacao`: (base_calc, resumo)."""
+        # Cópia rasa: as colunas dos tetos são escritas sem tocar o estado guardado
+        base_calc = self._linhas.copy(deep=False)
+        resumo = aplicar_tetos(base_calc, lucro_liquido, compensar_planos_proprios,
+                               totais=(self.total_basica_pre_cap, self.soma_props), redistribuir=redistribuir)
+        resumo["n_elegiveis"] = self.n_elegiveis
+        return finalizar_resultado(base_calc), resumo
@@ -0,0 +1,292 @@
+# plr_io.py – leitura da base e exportação do resultado (CSV/Excel/Parquet)
+# Usado pelo app Streamlit e pelo modo em lote (plr_cli.py).
+
+import os
+import zipfile
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals, is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+
+from plr_engine import (
+    REQUIRED_COLS, DERIVED_COLS, CATEGORICAL_COLS, ensure_required_columns, com_motivo_texto,
+    calcular_cubo, totais_por, dimensoes_preenchidas, cubo_com_subtotais,
+)
+
+LINHAS_POR_BLOCO = 200_000
+LINHAS_POR_BLOCO_EXPORT = 20_000
+LIMITE_LINHAS_EXCEL = 1_048_575   # linhas de dados por aba (1.048.576 menos o cabeçalho)
+COLUNAS_DATA = ["Data_Admissao", "Data_Desligamento"]
+# Formatos tentados na detecção, em ordem de preferência (dia antes do mês, como nos exports de RH)
+FORMATOS_DATA = ["ISO8601", "%d/%m/%Y", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d-%m-%Y", "%d.%m.%Y",
+                 "%m/%d/%Y", "%m/%d/%Y %H:%M", "%m/%d/%Y %H:%M:%S"]
+AMOSTRA_FORMATO_DATA = 1000
+LINHAS_AMOSTRA_DATA = 50_000      # linhas lidas (só nas colunas de data) para achar a amostra
+
+# =========================
+# Leitura
+# =========================
+def ler_base(arquivo, nome: str = None) -> pd.DataFrame:
+    """
+    Lê a base a partir de um caminho ou de um buffer (ex.: arquivo do st.file_uploader).
+    O formato é decidido pela extensão de `nome` (ou do próprio caminho).
+    """
+    nome = nome or getattr(arquivo, "name", None) or str(arquivo)
+    if nome.lower().endswith(".csv"):
+        base, _ = ler_csv_em_blocos(arquivo)
+        return base
+    if nome.lower().endswith(".parquet"):
+        return ler_parquet(arquivo)
+    return pd.read_excel(arquivo)
+
+def ler_parquet(arquivo) -> pd.DataFrame:
+    """
+    Lê uma base Parquet projetando só as colunas usadas no cálculo.
+    Datas e valores já chegam tipados, e `ensure_required_columns` não precisa reconvertê-los.
+    """
+    import pyarrow.parquet as pq
+
+    desejadas = set(REQUIRED_COLS + DERIVED_COLS)
+    nomes = pq.ParquetFile(arquivo).schema_arrow.names
+    if hasattr(arquivo, "seek"):
+        arquivo.seek(0)
+    colunas = [c for c in nomes if c.strip() in desejadas]
+    return pd.read_parquet(arquivo, columns=colunas)
+
+def _cabecalho_csv(arquivo) -> list:
+    """Nomes das colunas do CSV, sem consumir o buffer."""
+    pos = arquivo.tell() if hasattr(arquivo, "tell") else None
+    cols = list(pd.read_csv(arquivo, nrows=0).columns)
+    if pos is not None:
+        arquivo.seek(pos)
+    return cols
+
+def detectar_formato_data(valores: pd.Series) -> str:
+    """
+    Formato (de FORMATOS_DATA) que converte mais valores da amostra – os primeiros preenchidos.
+    Sem nenhum que sirva, "mixed": cada valor é interpretado sozinho, com o dia antes do mês.
+    """
+    amostra = valores.dropna().str.strip()
+    amostra = amostra[amostra != ""].head(AMOSTRA_FORMATO_DATA)
+    melhor, convertidos = "mixed", 0
+    for formato in FORMATOS_DATA:
+        n = int(pd.to_datetime(amostra, format=formato, errors="coerce").notna().sum())
+        if n > convertidos:
+            melhor, convertidos = formato, n
+    return melhor
+
+def _formatos_data(arquivo, colunas: list) -> dict:
+    """
+    Formato de cada coluna de data, detectado nos primeiros valores preenchidos das
+    LINHAS_AMOSTRA_DATA primeiras linhas (lidas só nessas colunas, sem consumir o buffer).
+    """
+    if not colunas:
+        return {}
+    pos = arquivo.tell() if hasattr(arquivo, "tell") else None
+    amostra = pd.read_csv(arquivo, usecols=colunas, dtype=str, nrows=LINHAS_AMOSTRA_DATA)
+    if pos is not None:
+        arquivo.seek(pos)
+    amostra.columns = amostra.columns.str.strip()
+    return {c: detectar_formato_data(amostra[c]) for c in amostra.columns if amostra[c].str.strip().ne("").any()}
+
+def _converter_datas(valores: pd.Series, formato: str) -> pd.Series:
+    return pd.to_datetime(valores.str.strip(), format=formato, errors="coerce", dayfirst=(formato == "mixed"))
+
+def ler_csv_em_blocos(arquivo, linhas_por_bloco: int = LINHAS_POR_BLOCO, formato_data: str = None):
+    """
+    Lê um CSV grande em blocos, com memória limitada pelo tamanho do bloco.
+
+    Só as colunas usadas no cálculo são lidas (REQUIRED_COLS e as antigas
+    Salario_Base/Verbas_Fixas_Salariais, para o caminho de compatibilidade), todas
+    como texto – evita que a inferência de tipos varie de um bloco para outro.
+    Cada bloco passa por `ensure_required_columns` assim que chega; as dimensões
+    de baixa cardinalidade viram categoria antes de o bloco ser guardado.
+
+    O formato das datas é decidido uma vez por coluna (`formato_data`, ou
+    `detectar_formato_data` nos primeiros valores preenchidos) e vale para todos os
+    blocos: o resultado não depende de onde o arquivo é dividido.
+
+    Retorna (base, relatorio), em que `relatorio` conta linhas lidas e valores
+    que não puderam ser convertidos (datas e salário) e traz os formatos de data usados.
+    """
+    desejadas = set(REQUIRED_COLS + DERIVED_COLS)
+    usecols = [c for c in _cabecalho_csv(arquivo) if str(c).strip() in desejadas]
+    relatorio = {"linhas": 0, "blocos": 0, "Data_Admissao_invalida": 0,
+                 "Data_Desligamento_invalida": 0, "Salario_invalido": 0}
+    colunas_data = [c for c in usecols if str(c).strip() in COLUNAS_DATA]
+    if formato_data:
+        formatos = {str(c).strip(): formato_data for c in colunas_data}
+    else:
+        formatos = _formatos_data(arquivo, colunas_data)
+
+    blocos = []
+    for bruto in pd.read_csv(arquivo, usecols=usecols, dtype=str, chunksize=linhas_por_bloco):
+        bruto.columns = bruto.columns.str.strip()
+        datas = {c: _converter_datas(bruto[c], formatos.get(c, "mixed")) for c in COLUNAS_DATA if c in bruto.columns}
+        bloco = ensure_required_columns(bruto.assign(**datas))
+
+        # Validação: valor preenchido no arquivo que virou NaT/NaN na conversão
+        for c in COLUNAS_DATA:
+            if c in bruto.columns:
+                relatorio[f"{c}_invalida"] += int((bruto[c].notna() & bloco[c].isna()).sum())
+        if "Salario" in bruto.columns:
+            relatorio["Salario_invalido"] += int((bruto["Salario"].notna() &
+                                                  pd.to_numeric(bruto["Salario"], errors="coerce").isna()).sum())
+
+        bloco = bloco[REQUIRED_COLS + DERIVED_COLS].astype({c: "category" for c in CATEGORICAL_COLS})
+        blocos.append(bloco)
+        relatorio["linhas"] += len(bloco)
+        relatorio["blocos"] += 1
+    relatorio["formatos_data"] = formatos
+
+    if not blocos:
+        return ensure_required_columns(pd.DataFrame(columns=usecols))[REQUIRED_COLS + DERIVED_COLS], relatorio
+
+    # Concatena as categorias pela união (pd.concat voltaria para object se diferirem)
+    categorias = {c: union_categoricals([b[c] for b in blocos]) for c in CATEGORICAL_COLS}
+    base = pd.concat([b.drop(columns=CATEGORICAL_COLS) for b in blocos], ignore_index=True)
+    del blocos
+    for c in CATEGORICAL_COLS:
+        base[c] = categorias[c]
+    return base[REQUIRED_COLS + DERIVED_COLS], relatorio
+
+# =========================
+# Exportação (números puros)
+# =========================
+def nomes_planilhas_totais(cubo: pd.DataFrame) -> list:
+    """Totais_<dimensão> para as dimensões preenchidas e Totais_Cubo (sem montar as tabelas)."""
+    preenchidas = dimensoes_preenchidas(cubo)
+    return [f"Totais_{c}" for c in preenchidas] + (["Totais_Cubo"] if preenchidas else [])
+
+def planilha_totais(cubo: pd.DataFrame, nome: str) -> pd.DataFrame:
+    """Só a aba `nome` de `planilhas_totais`."""
+    if nome == "Totais_Cubo":
+        return cubo_com_subtotais(cubo)
+    return totais_por(cubo, [nome.removeprefix("Totais_")])
+
+def planilhas_totais(cubo: pd.DataFrame) -> dict:
+    """
+    Abas de totais, todas montadas a partir do cubo (sem reler a base): Totais_Diretoria,
+    Totais_Centro_Custo e Totais_Cargo para as dimensões preenchidas e Totais_Cubo com os subtotais.
+    """
+    return {nome: planilha_totais(cubo, nome) for nome in nomes_planilhas_totais(cubo)}
+
+def _arredondar(df: pd.DataFrame) -> pd.DataFrame:
+    return df.round({c: 2 for c in df.columns if is_numeric_dtype(df[c]) and not is_bool_dtype(df[c])})
+
+def planilha_resultado(base_calc: pd.DataFrame, arredondar: bool = True) -> pd.DataFrame:
+    """Aba Resultado_Antecipacao: uma linha por colaborador, com o texto de Motivo_Elegibilidade."""
+    df = com_motivo_texto(base_calc)
+    return _arredondar(df) if arredondar else df
+
+def planilhas_resultado(base_calc: pd.DataFrame, arredondar: bool = True, cubo: pd.DataFrame = None) -> dict:
+    """
+    Abas exportadas: Resultado_Antecipacao e as de `planilhas_totais` (do `cubo` já calculado,
+    se informado). Com `arredondar=False` as colunas numéricas seguem sem cópia (o Excel em
+    streaming arredonda bloco a bloco).
+    """
+    sheets = {"Resultado_Antecipacao": planilha_resultado(base_calc, arredondar)}
+    if cubo is None:
+        cubo = calcular_cubo(base_calc)
+    for nome, df in planilhas_totais(cubo).items():
+        sheets[nome] = _arredondar(df) if arredondar else df
+    return sheets
+
+def _valores_coluna(s: pd.Series, casas) -> list:
+    """Valores Python prontos para o xlsxwriter (NaN/NaT viram célula vazia)."""
+    if is_datetime64_any_dtype(s):
+        return [None if pd.isna(x) else x.to_pydatetime() for x in s]
+    if is_bool_dtype(s):
+        return s.astype(object).where(s.notna(), None).tolist()
+    if is_numeric_dtype(s):
+        arr = s.to_numpy(dtype=float, na_value=np.nan)
+        if casas is not None:
+            arr = arr.round(casas)
+        out = arr.astype(object)
+        out[np.isnan(arr)] = None
+        return out.tolist()
+    return [None if pd.isna(x) else (x if isinstance(x, (str, int, float)) else str(x))
+            for x in s.astype(object)]
+
+def escrever_excel(df_dict, destino, casas: int = None, linhas_por_bloco: int = LINHAS_POR_BLOCO_EXPORT,
+                   casas_por_coluna: dict = None) -> None:
+    """
+    Grava as abas com o xlsxwriter em modo constant_memory: as linhas são escritas em
+    ordem, bloco a bloco, e descarregadas em disco – a memória não cresce com o número de linhas.
+    `destino` pode ser um caminho ou um buffer; `casas` arredonda as colunas numéricas, e
+    `casas_por_coluna` ({coluna: casas}) troca esse arredondamento nas colunas indicadas.
+    """
+    casas_por_coluna = casas_por_coluna or {}
+    import xlsxwriter
+
+    wb = xlsxwriter.Workbook(destino, {
+        "constant_memory": True,
+        "strings_to_formulas": False,
+        "strings_to_urls": False,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+    })
+    negrito = wb.add_format({"bold": True, "border": 1, "align": "center"})
+    for name, df in df_dict.items():
+        ws = wb.add_worksheet(name)
+        ws.write_row(0, 0, [str(c) for c in df.columns], negrito)
+        for ini in range(0, len(df), linhas_por_bloco):
+            bloco = df.iloc[ini:ini + linhas_por_bloco]
+            colunas = [_valores_coluna(bloco[c], casas_por_coluna.get(c, casas)) for c in bloco.columns]
+            for i, linha in enumerate(zip(*colunas), start=ini + 1):
+                ws.write_row(i, 0, linha)
+    wb.close()
+
+def to_excel_bytes(df_dict, casas: int = None, casas_por_coluna: dict = None) -> bytes:
+    output = BytesIO()
+    escrever_excel(df_dict, output, casas=casas, casas_por_coluna=casas_por_coluna)
+    return output.getvalue()
+
+def escrever_csv_zip(df_dict, destino, linhas_por_bloco: int = LINHAS_POR_BLOCO_EXPORT) -> None:
+    """Um CSV por aba dentro de um ZIP (deflate), escrito em blocos direto no arquivo compactado."""
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, df in df_dict.items():
+            with zf.open(f"{name}.csv", "w", force_zip64=True) as f:
+                for ini in range(0, max(len(df), 1), linhas_por_bloco):
+                    bloco = df.iloc[ini:ini + linhas_por_bloco]
+                    f.write(bloco.to_csv(index=False, header=(ini == 0)).encode("utf-8"))
+
+def to_csv_zip_bytes(df_dict) -> bytes:
+    output = BytesIO()
+    escrever_csv_zip(df_dict, output)
+    return output.getvalue()
+
+def _para_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas object com tipos misturados (ex.: Matrícula int e str) viram texto para o Arrow."""
+    obj = [c for c in df.columns if df[c].dtype == object]
+    if not obj:
+        return df
+    return df.astype({c: "string" for c in obj})
+
+def to_parquet_bytes(df: pd.DataFrame) -> bytes:
+    output = BytesIO()
+    _para_parquet(df).to_parquet(output, index=False)
+    return output.getvalue()
+
+def salvar_resultado(base_calc: pd.DataFrame, caminho: str) -> None:
+    """
+    Grava o resultado em .xlsx (todas as abas), .zip (um CSV por aba), .csv (apenas
+    Resultado_Antecipacao) ou .parquet (Resultado_Antecipacao em `caminho` e cada aba
+    extra em `<nome>_<aba>.parquet`).
+    """
+    raiz, ext = os.path.splitext(caminho)
+    ext = ext.lower()
+    if ext == ".xlsx":
+        escrever_excel(planilhas_resultado(base_calc, arredondar=False), caminho, casas=2)
+        return
+    sheets = planilhas_resultado(base_calc)
+    if ext == ".zip":
+        escrever_csv_zip(sheets, caminho)
+    elif ext == ".csv":
+        sheets["Resultado_Antecipacao"].to_csv(caminho, index=False)
+    elif ext == ".parquet":
+        for name, df in sheets.items():
+            destino = caminho if name == "Resultado_Antecipacao" else f"{raiz}_{name}.parquet"
+            _para_parquet(df).to_parquet(destino, index=False)
+    else:
+        raise ValueError(f"Formato de saída não suportado: {caminho} (use .xlsx, .zip, .csv ou .parquet)")
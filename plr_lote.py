@@ -0,0 +1,208 @@
+# plr_lote.py – apuração de várias entidades (uma base por empresa) em paralelo
+# Cada entidade passa por leitura, normalização, elegibilidade e tetos em um processo
+# separado; a falha de um arquivo fica registrada no resumo sem interromper os demais.
+#
+# Exemplo:
+#   python plr_lote.py bases/ --parametros parametros.csv -o PLR_Consolidado_2025.xlsx
+#
+# Planilha de parâmetros: colunas Entidade (nome do arquivo sem extensão) e Lucro_Liquido;
+# opcionais Data_Assinatura e Compensar (sim/não).
+
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+
+import pandas as pd
+
+from plr_engine import calcular_antecipacao, com_motivo_texto, deduplicar_matricula, ensure_required_columns, fmt_brl
+from plr_io import ler_base, escrever_excel
+
+EXTENSOES_BASE = (".csv", ".xlsx", ".parquet")
+CASAS_LOTE = {"Fator_Cap": 6}   # colunas com mais casas que os valores em R$ no Excel consolidado
+
+# =========================
+# Parâmetros por entidade
+# =========================
+def ler_parametros(arquivo, nome: str = None) -> pd.DataFrame:
+    """
+    Planilha de parâmetros indexada por Entidade (Lucro_Liquido, Data_Assinatura, Compensar).
+    Data_Assinatura e Compensar em branco ficam NA (valem os padrões do lote).
+    """
+    nome = nome or getattr(arquivo, "name", None) or str(arquivo)
+    tipos = {"Entidade": str, "Compensar": str}
+    if nome.lower().endswith(".csv"):
+        params = pd.read_csv(arquivo, dtype=tipos)
+    else:
+        params = pd.read_excel(arquivo, dtype=tipos)
+    params.columns = params.columns.str.strip()
+    if "Entidade" not in params.columns or "Lucro_Liquido" not in params.columns:
+        raise ValueError("A planilha de parâmetros precisa das colunas Entidade e Lucro_Liquido.")
+    params["Entidade"] = params["Entidade"].str.strip()
+    params["Lucro_Liquido"] = pd.to_numeric(params["Lucro_Liquido"], errors="coerce")
+    if "Data_Assinatura" in params.columns:
+        params["Data_Assinatura"] = pd.to_datetime(params["Data_Assinatura"], errors="coerce")
+    if "Compensar" in params.columns:
+        texto = params["Compensar"].str.strip().str.lower()
+        compensar = texto.isin(["sim", "s", "true", "1", "x"]).astype("boolean")
+        params["Compensar"] = compensar.mask(texto.isna() | (texto == ""))
+    return params.drop_duplicates(subset=["Entidade"], keep="last").set_index("Entidade")
+
+def nome_entidade(arquivo: str) -> str:
+    return os.path.splitext(os.path.basename(arquivo))[0].strip()
+
+def listar_bases(pasta: str) -> dict:
+    """{entidade: caminho} para os arquivos de base de uma pasta."""
+    return {
+        nome_entidade(f): os.path.join(pasta, f)
+        for f in sorted(os.listdir(pasta)) if f.lower().endswith(EXTENSOES_BASE)
+    }
+
+# =========================
+# Processamento
+# =========================
+def processar_entidade(entidade, origem, nome_arquivo, lucro, data_assinatura,
+                       compensar: bool = False, dedup: bool = True) -> dict:
+    """
+    Apuração de uma entidade. `origem` é um caminho ou os bytes do arquivo.
+    Nunca levanta exceção: erros voltam em {"status": "erro", "erro": ...}.
+    """
+    inicio = time.perf_counter()
+    try:
+        if pd.isna(lucro):
+            raise ValueError("Entidade sem Lucro_Liquido na planilha de parâmetros.")
+        arquivo = BytesIO(origem) if isinstance(origem, (bytes, bytearray)) else origem
+        base = ensure_required_columns(ler_base(arquivo, nome_arquivo))
+        if dedup:
+            base = deduplicar_matricula(base)
+        if base.empty:
+            raise ValueError("Base vazia.")
+        base_calc, resumo = calcular_antecipacao(base, lucro, data_assinatura, compensar)
+        return {"entidade": entidade, "status": "ok", "erro": "", "base_calc": base_calc, "resumo": resumo,
+                "segundos": time.perf_counter() - inicio}
+    except Exception as e:  # uma base com problema não derruba o lote
+        return {"entidade": entidade, "status": "erro", "erro": f"{type(e).__name__}: {e}", "base_calc": None,
+                "resumo": None, "segundos": time.perf_counter() - inicio}
+
+def processar_lote(bases: dict, parametros: pd.DataFrame, data_assinatura_padrao,
+                   compensar_padrao: bool = False, dedup: bool = True,
+                   max_workers: int = None, ao_concluir=None) -> list:
+    """
+    Processa {entidade: (origem, nome_arquivo)} em um pool de processos.
+    Lucro, data de assinatura e compensação vêm da planilha de parâmetros (com os padrões
+    informados quando a coluna/valor não existir). `ao_concluir(feitos, total, resultado)`
+    é chamado a cada entidade concluída. Retorna os resultados na ordem de `bases`.
+    """
+    tarefas = {}
+    for entidade, (origem, nome_arquivo) in bases.items():
+        p = parametros.loc[entidade] if entidade in parametros.index else None
+        lucro = p["Lucro_Liquido"] if p is not None else float("nan")
+        data = p.get("Data_Assinatura") if p is not None else None
+        data = data_assinatura_padrao if data is None or pd.isna(data) else data
+        compensar = p.get("Compensar") if p is not None else None
+        compensar = compensar_padrao if compensar is None or pd.isna(compensar) else bool(compensar)
+        tarefas[entidade] = (entidade, origem, nome_arquivo, lucro, data, compensar, dedup)
+
+    resultados = {}
+    # "spawn": processos novos, sem herdar por fork as threads e o estado do processo pai
+    # (servidor do Streamlit, caches, conexões SQLite)
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), mp_context=contexto) as pool:
+        futuros = {pool.submit(processar_entidade, *args): ent for ent, args in tarefas.items()}
+        for feitos, futuro in enumerate(as_completed(futuros), start=1):
+            ent = futuros[futuro]
+            try:
+                resultados[ent] = futuro.result()
+            except Exception as e:  # ex.: processo filho encerrado
+                resultados[ent] = {"entidade": ent, "status": "erro", "erro": f"{type(e).__name__}: {e}",
+                                   "base_calc": None, "resumo": None, "segundos": 0.0}
+            if ao_concluir is not None:
+                ao_concluir(feitos, len(futuros), resultados[ent])
+    return [resultados[ent] for ent in tarefas]
+
+# =========================
+# Consolidação
+# =========================
+def resumo_lote(resultados: list) -> pd.DataFrame:
+    linhas = []
+    for r in resultados:
+        ok = r["status"] == "ok"
+        bc, rs = r["base_calc"], r["resumo"]
+        linhas.append({
+            "Entidade": r["entidade"],
+            "Status": r["status"],
+            "Erro": r["erro"],
+            "Linhas": len(bc) if ok else 0,
+            "Elegiveis": rs["n_elegiveis"] if ok else 0,
+            "Fator_Cap": rs["fator_cap"] if ok else None,
+            "Total_Basica_Final": float(bc["Basica_Final"].sum()) if ok else 0.0,
+            "Total_Adicional_Final": float(bc["Adicional_Final"].sum()) if ok else 0.0,
+            "Total_Antecipacao": float(bc["PLR_Antecipacao_Total"].sum()) if ok else 0.0,
+            "Segundos": round(r["segundos"], 3),
+        })
+    return pd.DataFrame(linhas)
+
+def _nome_aba(entidade: str, usados: set) -> str:
+    """Nome de aba válido no Excel (até 31 caracteres, sem []:*?/\\) e único."""
+    base = re.sub(r"[\[\]:*?/\\]", "_", str(entidade))[:31] or "Entidade"
+    nome, i = base, 2
+    while nome.lower() in usados:
+        sufixo = f"_{i}"
+        nome, i = base[:31 - len(sufixo)] + sufixo, i + 1
+    usados.add(nome.lower())
+    return nome
+
+def planilhas_lote(resultados: list) -> dict:
+    """Aba Resumo seguida de uma aba por entidade processada com sucesso."""
+    sheets = {"Resumo": resumo_lote(resultados)}
+    usados = {"resumo"}
+    for r in resultados:
+        if r["status"] == "ok":
+            sheets[_nome_aba(r["entidade"], usados)] = com_motivo_texto(r["base_calc"])
+    return sheets
+
+def salvar_lote(resultados: list, caminho) -> None:
+    escrever_excel(planilhas_lote(resultados), caminho, casas=2, casas_por_coluna=CASAS_LOTE)
+
+# =========================
+# Linha de comando
+# =========================
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Calculadora de PLR – Antecipação 2025 (várias entidades).")
+    p.add_argument("pasta", help="Pasta com uma base por entidade (.csv, .xlsx ou .parquet)")
+    p.add_argument("--parametros", required=True, help="Planilha com Entidade e Lucro_Liquido (.csv ou .xlsx)")
+    p.add_argument("--assinatura", default="2025-09-01", help="Data de assinatura padrão da CCT (AAAA-MM-DD)")
+    p.add_argument("--compensar", action="store_true", help="Compensação padrão dos valores já pagos em 2025")
+    p.add_argument("--manter-duplicatas", action="store_true", help="Não remover duplicatas por Matrícula")
+    p.add_argument("--processos", type=int, default=None, help="Processos em paralelo (padrão: núcleos da máquina)")
+    p.add_argument("-o", "--saida", default="PLR_Consolidado_2025.xlsx", help="Excel consolidado de saída")
+    return p.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    bases = {ent: (caminho, caminho) for ent, caminho in listar_bases(args.pasta).items()}
+    if not bases:
+        print(f"Nenhuma base encontrada em {args.pasta}.", file=sys.stderr)
+        return 1
+    parametros = ler_parametros(args.parametros)
+
+    def progresso(feitos, total, r):
+        print(f"[{feitos}/{total}] {r['entidade']}: {r['status']} {r['erro']}".rstrip(), file=sys.stderr)
+
+    resultados = processar_lote(bases, parametros, pd.to_datetime(args.assinatura).date(), args.compensar,
+                                not args.manter_duplicatas, args.processos, progresso)
+    salvar_lote(resultados, args.saida)
+
+    resumo = resumo_lote(resultados)
+    n_erros = int((resumo["Status"] != "ok").sum())
+    print(f"Entidades: {len(resumo)} ({n_erros} com erro)")
+    print(f"Antecipação Total consolidada: {fmt_brl(resumo['Total_Antecipacao'].sum())}")
+    print(f"Resultado gravado em {args.saida}")
+    return 0 if n_erros == 0 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# plr_metricas.py – instrumentação por etapa (tempo, linhas e memória aproximada)
+# Usado pelo app (painel de diagnóstico), pelo motor e pelo modo em lote (plr_cli.py).
+# Desligado, cada etapa custa uma chamada de função: nada é medido nem registrado.
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger("plr.metricas")
+
+class Etapa:
+    """Registro de uma etapa; quem mede pode informar o DataFrame produzido em `df`."""
+    __slots__ = ("nome", "segundos", "linhas", "memoria_bytes", "df")
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.segundos = 0.0
+        self.linhas = None
+        self.memoria_bytes = None
+        self.df = None
+
+    def como_dict(self) -> dict:
+        return {"etapa": self.nome, "segundos": round(self.segundos, 6),
+                "linhas": self.linhas, "memoria_bytes": self.memoria_bytes}
+
+class Medidor:
+    """
+    Coleta as etapas de uma apuração:
+
+        with medidor.etapa("elegibilidade") as e:
+            ...
+            e.df = base_calc
+
+    Com `ativo=False` as etapas não são medidas; com `registrar_log=True` cada etapa
+    vira uma linha JSON no logger "plr.metricas" (campos de `contexto` incluídos).
+    """
+
+    def __init__(self, ativo: bool = True, registrar_log: bool = False, contexto: dict = None):
+        self.ativo = ativo or registrar_log
+        self.registrar_log = registrar_log
+        self.contexto = contexto or {}
+        self.etapas = []
+
+    @contextmanager
+    def etapa(self, nome: str):
+        if not self.ativo:
+            yield _ETAPA_NULA
+            return
+        e = Etapa(nome)
+        t0 = time.perf_counter()
+        try:
+            yield e
+        finally:
+            e.segundos = time.perf_counter() - t0
+            if e.df is not None:
+                e.linhas = int(len(e.df))
+                # deep=False: tamanho dos buffers, sem percorrer strings Python uma a uma
+                e.memoria_bytes = int(e.df.memory_usage(index=True, deep=False).sum())
+                e.df = None
+            self.etapas.append(e)
+            if self.registrar_log:
+                logger.info(json.dumps({**self.contexto, **e.como_dict()}, ensure_ascii=False, default=str))
+
+    def tabela(self) -> pd.DataFrame:
+        """Uma linha por etapa, na ordem em que foram medidas."""
+        return pd.DataFrame([e.como_dict() for e in self.etapas],
+                            columns=["etapa", "segundos", "linhas", "memoria_bytes"]
+                            ).astype({"linhas": "Int64", "memoria_bytes": "Int64"})
+
+class _EtapaNula:
+    """Devolvida quando o medidor está desligado: descarta o que for atribuído (não retém o DataFrame)."""
+    __slots__ = ()
+
+    def __setattr__(self, nome, valor):
+        pass
+
+_ETAPA_NULA = _EtapaNula()
+
+MEDIDOR_DESLIGADO = Medidor(ativo=False)
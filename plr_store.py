@@ -0,0 +1,227 @@
+# plr_store.py – base do cadastro manual persistida em SQLite
+# Uma linha por Matrícula (chave primária = índice único): inclusão/correção é um upsert
+# O(log n), os dados sobrevivem ao fim da sessão e o editor lê só a página exibida.
+# As correções também podem ser aplicadas por cima de uma base enviada por upload.
+
+import os
+import sqlite3
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from plr_engine import REQUIRED_COLS
+
+CAMINHO_PADRAO = os.environ.get("PLR_BASE_MANUAL", "plr_base_manual.sqlite")
+
+_TIPOS = {"Salario": "REAL", "Valor_Pago_2025": "REAL"}
+_DATAS = ["Data_Admissao", "Data_Desligamento"]
+GRAVACOES_NO_HISTORICO = 1000   # gravações lembradas por `mudancas_desde`
+_LOTE_CONSULTA = 500            # Matrículas por consulta IN (...) (limite de parâmetros do SQLite)
+
+class BaseManual:
+    """
+    Cadastro manual em SQLite (tabela `colaboradores`, chave primária Matricula).
+
+    Datas são gravadas como texto ISO (AAAA-MM-DD) e voltam como datetime64;
+    Matrícula é sempre texto. Uma conexão por instância, protegida por lock
+    (o Streamlit pode atender reruns em threads diferentes).
+
+    `impressao()` muda a cada gravação feita por esta instância: serve de chave de cache
+    da base sem reler nem percorrer a tabela. `mudancas_desde(impressao)` devolve as
+    Matrículas gravadas ou removidas depois dela, e `ler_desde(impressao)` as lê junto com
+    a impressão a que correspondem (para a apuração incremental).
+    """
+
+    def __init__(self, caminho: str = CAMINHO_PADRAO):
+        self.caminho = caminho
+        self.versao = 0
+        self._id = uuid.uuid4().hex
+        self._historico = deque(maxlen=GRAVACOES_NO_HISTORICO)   # (versão, Matrículas ou None)
+        self._lock = threading.RLock()   # reentrante: `ler_desde` agrupa várias leituras
+        self._con = sqlite3.connect(caminho, check_same_thread=False)
+        colunas = ", ".join(
+            "Matricula TEXT PRIMARY KEY" if c == "Matricula" else f"{c} {_TIPOS.get(c, 'TEXT')}"
+            for c in REQUIRED_COLS
+        )
+        with self._lock, self._con:
+            self._con.execute("PRAGMA journal_mode=WAL")
+            self._con.execute("PRAGMA synchronous=NORMAL")
+            self._con.execute(f"CREATE TABLE IF NOT EXISTS colaboradores ({colunas}, Atualizado_Em TEXT)")
+
+    # =========================
+    # Escrita
+    # =========================
+    def upsert(self, df: pd.DataFrame) -> int:
+        """Inclui ou substitui (por Matrícula) as linhas de `df`; retorna quantas foram gravadas."""
+        linhas = self._para_linhas(df)
+        if not linhas:
+            return 0
+        cols = REQUIRED_COLS + ["Atualizado_Em"]
+        atualizar = ", ".join(f"{c} = excluded.{c}" for c in cols if c != "Matricula")
+        sql = (f"INSERT INTO colaboradores ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+               f"ON CONFLICT(Matricula) DO UPDATE SET {atualizar}")
+        with self._lock, self._con:
+            self._con.executemany(sql, linhas)
+            self._registrar({linha[0] for linha in linhas})
+        return len(linhas)
+
+    def remover(self, matriculas) -> int:
+        matriculas = [(str(m),) for m in matriculas]
+        if not matriculas:
+            return 0
+        with self._lock, self._con:
+            cur = self._con.executemany("DELETE FROM colaboradores WHERE Matricula = ?", matriculas)
+            self._registrar({m for m, in matriculas})
+        return cur.rowcount
+
+    def limpar(self) -> None:
+        with self._lock, self._con:
+            self._con.execute("DELETE FROM colaboradores")
+            self._registrar(None)
+
+    def _registrar(self, matriculas) -> None:
+        """Nova versão; `matriculas` = afetadas pela gravação (None = todas)."""
+        self.versao += 1
+        self._historico.append((self.versao, matriculas))
+
+    # =========================
+    # Leitura
+    # =========================
+    def impressao(self) -> tuple:
+        """(instância, versão): igual enquanto nada for gravado no cadastro."""
+        return (self.caminho, self._id, self.versao)
+
+    def mudancas_desde(self, impressao) -> set:
+        """
+        Matrículas incluídas, alteradas ou removidas depois de `impressao` (conjunto vazio se
+        nada mudou). None quando não dá para saber: outra instância, histórico já descartado
+        ou cadastro apagado – quem pergunta deve recarregar tudo.
+        """
+        with self._lock:
+            if impressao is None or tuple(impressao[:2]) != (self.caminho, self._id):
+                return None
+            desde = impressao[2]
+            if desde == self.versao:
+                return set()
+            if not self._historico or self._historico[0][0] > desde + 1:
+                return None
+            mudadas = set()
+            for versao, matriculas in self._historico:
+                if versao <= desde:
+                    continue
+                if matriculas is None:
+                    return None
+                mudadas |= matriculas
+            return mudadas
+
+    def ler_desde(self, impressao):
+        """
+        (linhas, mudadas, impressao_atual), lidos sob o mesmo lock: as linhas são exatamente as
+        da `impressao_atual`, mesmo que outra sessão grave logo em seguida. `mudadas` como em
+        `mudancas_desde`; com None, `linhas` é a base inteira, senão só as dessas Matrículas
+        (as ausentes foram removidas) ou None se nada mudou.
+        """
+        with self._lock:
+            mudadas = self.mudancas_desde(impressao)
+            if mudadas is None:
+                linhas = self.carregar()
+            else:
+                linhas = self.linhas(mudadas) if mudadas else None
+            return linhas, mudadas, self.impressao()
+
+    def existe(self, matricula) -> bool:
+        with self._lock:
+            cur = self._con.execute("SELECT 1 FROM colaboradores WHERE Matricula = ?", (str(matricula),))
+            return cur.fetchone() is not None
+
+    def contar(self, busca: str = "") -> int:
+        where, params = self._filtro(busca)
+        with self._lock:
+            return self._con.execute(f"SELECT COUNT(*) FROM colaboradores{where}", params).fetchone()[0]
+
+    def pagina(self, pagina: int = 1, tamanho_pagina: int = 100, busca: str = "") -> pd.DataFrame:
+        """Linhas de uma página, em ordem de Matrícula (percorre o índice da chave primária)."""
+        where, params = self._filtro(busca)
+        ini = max(0, (int(pagina) - 1) * int(tamanho_pagina))
+        return self._consultar(f"SELECT {', '.join(REQUIRED_COLS)} FROM colaboradores{where} "
+                               f"ORDER BY Matricula LIMIT ? OFFSET ?", params + [int(tamanho_pagina), ini])
+
+    def carregar(self) -> pd.DataFrame:
+        """Base inteira (para a apuração)."""
+        return self._consultar(f"SELECT {', '.join(REQUIRED_COLS)} FROM colaboradores ORDER BY Matricula", [])
+
+    def linhas(self, matriculas) -> pd.DataFrame:
+        """Só as linhas das Matrículas pedidas que existem no cadastro (busca pela chave primária)."""
+        matriculas = sorted(str(m) for m in matriculas)
+        partes = [
+            self._consultar(f"SELECT {', '.join(REQUIRED_COLS)} FROM colaboradores "
+                            f"WHERE Matricula IN ({', '.join('?' * len(lote))}) ORDER BY Matricula", lote)
+            for lote in (matriculas[i:i + _LOTE_CONSULTA] for i in range(0, len(matriculas), _LOTE_CONSULTA))
+        ]
+        if not partes:
+            return self.pagina(1, 0)   # só as colunas
+        return pd.concat(partes, ignore_index=True)
+
+    def aplicar_sobre(self, base: pd.DataFrame, correcoes: pd.DataFrame = None) -> pd.DataFrame:
+        """
+        Correções do cadastro por cima de `base`: Matrículas presentes nos dois ficam com a
+        versão do cadastro (na posição original); as que só existem no cadastro vão ao final.
+        `correcoes`: o cadastro já lido (ex.: por `ler_desde`); sem ele, é lido agora.
+        """
+        if correcoes is None:
+            correcoes = self.carregar()
+        if correcoes.empty or "Matricula" not in base.columns:
+            return base
+        base = base.copy(deep=False)
+        base["Matricula"] = base["Matricula"].astype(str)
+        correcoes = correcoes.set_index("Matricula")
+        pos = correcoes.index.get_indexer(base["Matricula"])
+        corrigidas = pos >= 0
+        if corrigidas.any():
+            origem = np.where(corrigidas, pos, 0)
+            for c in correcoes.columns:
+                if c not in base.columns:
+                    continue
+                atual = base[c]
+                if isinstance(atual.dtype, pd.CategoricalDtype):
+                    atual = atual.astype(object)
+                base[c] = atual.mask(corrigidas, correcoes[c].to_numpy()[origem])
+        novas = correcoes[~correcoes.index.isin(base["Matricula"])].reset_index()
+        return pd.concat([base, novas], ignore_index=True) if len(novas) else base
+
+    # =========================
+    # Conversões
+    # =========================
+    @staticmethod
+    def _filtro(busca: str):
+        busca = (busca or "").strip()
+        if not busca:
+            return "", []
+        return " WHERE Matricula LIKE ? OR Nome LIKE ?", [f"{busca}%", f"%{busca}%"]
+
+    def _consultar(self, sql: str, params: list) -> pd.DataFrame:
+        with self._lock:
+            df = pd.read_sql_query(sql, self._con, params=params)
+        for c in _DATAS:
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+        return df
+
+    @staticmethod
+    def _para_linhas(df: pd.DataFrame) -> list:
+        df = df[[c for c in REQUIRED_COLS if c in df.columns]].copy()
+        for c in REQUIRED_COLS:
+            if c not in df.columns:
+                df[c] = None
+        df = df[df["Matricula"].notna() & (df["Matricula"].astype(str).str.strip() != "")]
+        df["Matricula"] = df["Matricula"].astype(str).str.strip()
+        for c in _DATAS:
+            df[c] = pd.to_datetime(df[c], errors="coerce").dt.strftime("%Y-%m-%d")
+        for c in _TIPOS:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+        df["Atualizado_Em"] = datetime.now().isoformat(timespec="seconds")
+        df = df[REQUIRED_COLS + ["Atualizado_Em"]].astype(object)
+        return df.where(df.notna(), None).values.tolist()
@@ -0,0 +1,75 @@
+# plr_tarefas.py – apuração em segundo plano (thread) com progresso e cancelamento
+# O app dispara a tarefa e continua respondendo; a cada rerun lê o progresso por etapa
+# e, ao fim, anexa o resultado à sessão.
+
+import threading
+import time
+
+from plr_engine import calcular_antecipacao
+
+LINHAS_EM_SEGUNDO_PLANO = 200_000          # bases a partir deste tamanho são apuradas numa thread
+LINHAS_POR_BLOCO_ELEGIBILIDADE = 100_000
+ETAPAS_PROGRESSO = ["normalizacao", "deduplicacao", "elegibilidade", "tetos"]
+
+class ApuracaoCancelada(Exception):
+    """Levantada dentro da thread, no próximo aviso de progresso após `cancelar()`."""
+
+class TarefaApuracao:
+    """
+    Uma execução de `calcular_antecipacao` numa thread própria.
+
+    `estado` vai de "executando" a "concluida", "cancelada" ou "erro"; `progresso`
+    guarda {etapa: (linhas processadas, total)}; `resultado` = (base_calc, resumo).
+    A thread não toca no st.session_state – só nos atributos desta instância.
+    Uma thread (e não um processo) para que o resultado fique na memória da sessão
+    sem serialização; a elegibilidade em blocos devolve o GIL entre um bloco e outro.
+    """
+
+    def __init__(self, chave, base, lucro_liquido, data_assinatura, compensar_planos_proprios: bool = False,
+                 linhas_por_bloco: int = LINHAS_POR_BLOCO_ELEGIBILIDADE, medidor=None, redistribuir: bool = False):
+        self.chave = chave
+        self.estado = "executando"
+        self.progresso = {etapa: (0, len(base)) for etapa in ETAPAS_PROGRESSO}
+        self.resultado = None
+        self.erro = None
+        self.inicio = time.perf_counter()
+        self.fim = None
+        self._cancelar = threading.Event()
+        self._args = (base, lucro_liquido, data_assinatura, compensar_planos_proprios)
+        self.medidor = medidor
+        self._kwargs = {"linhas_por_bloco": linhas_por_bloco, "medidor": medidor, "progresso": self._avisar,
+                        "redistribuir": redistribuir}
+        self._thread = threading.Thread(target=self._executar, name="plr-apuracao", daemon=True)
+
+    def iniciar(self) -> "TarefaApuracao":
+        self._thread.start()
+        return self
+
+    def cancelar(self) -> None:
+        self._cancelar.set()
+
+    @property
+    def ativa(self) -> bool:
+        return self.estado == "executando"
+
+    @property
+    def segundos(self) -> float:
+        return (self.fim or time.perf_counter()) - self.inicio
+
+    def _avisar(self, etapa: str, feitas: int, total: int) -> None:
+        if self._cancelar.is_set():
+            raise ApuracaoCancelada()
+        self.progresso[etapa] = (feitas, total)
+
+    def _executar(self) -> None:
+        try:
+            self.resultado = calcular_antecipacao(*self._args, **self._kwargs)
+            self.estado = "concluida"
+        except ApuracaoCancelada:
+            self.estado = "cancelada"
+        except Exception as exc:   # o erro é mostrado no app, não derruba a thread do servidor
+            self.erro = f"{type(exc).__name__}: {exc}"
+            self.estado = "erro"
+        finally:
+            self._args = None
+            self.fim = time.perf_counter()
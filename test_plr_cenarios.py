@@ -0,0 +1,49 @@
+# test_plr_cenarios.py – somas em forma fechada da simulação iguais às fórmulas diretas
+# Rodar: python -m pytest -q
+
+import numpy as np
+import pytest
+
+from benchmark_plr import gerar_base_sintetica
+from plr_cenarios import _soma_min, _soma_positiva, simular_cenarios
+from plr_engine import calcular_antecipacao
+
+def _tetos_e_pesos(n, semente):
+    rng = np.random.default_rng(semente)
+    pesos = rng.choice([1 / 12, 5 / 12, 0.5, 1.0], n)          # proporcionalidades repetidas (empates)
+    tetos = np.round(rng.uniform(0, 5000, n), 2) * pesos
+    tetos[rng.random(n) < 0.05] = 0.0
+    return pesos, tetos
+
+def test_soma_min_igual_a_formula_direta():
+    pesos, tetos = _tetos_e_pesos(3000, 1)
+    limiares = tetos / pesos
+    # Níveis exatamente nos limiares, entre eles, zero e acima do maior
+    niveis = np.concatenate([[0.0, 1e-9, limiares.max() * 2], limiares[:200], np.linspace(0, limiares.max(), 50)])
+    esperado = np.array([np.minimum(a * pesos, tetos).sum() for a in niveis])
+    np.testing.assert_allclose(_soma_min(limiares, pesos, tetos, niveis), esperado, rtol=1e-10, atol=1e-6)
+
+def test_soma_positiva_igual_a_formula_direta():
+    rng = np.random.default_rng(2)
+    n = 3000
+    cap = np.round(rng.uniform(0, 3000, n), 2)
+    cap[rng.random(n) < 0.05] = 0.0                         # linhas sem Regra Básica
+    pagos = np.where(rng.random(n) < 0.5, 0.0, np.round(rng.uniform(0, 4000, n), 2))
+    com_cap = cap > 0
+    fatores = np.concatenate([[0.0, 0.25, 1.0], (pagos[com_cap] / cap[com_cap])[:200], np.linspace(0, 1, 50)])
+    esperado = np.array([np.maximum(f * cap - pagos, 0.0).sum() for f in fatores])
+    np.testing.assert_allclose(_soma_positiva(cap, pagos, fatores), esperado, rtol=1e-10, atol=1e-6)
+
+@pytest.mark.parametrize("compensar", [False, True])
+def test_simulacao_igual_a_apuracao_completa(compensar):
+    base = gerar_base_sintetica(3000, semente=4)
+    lucros = [0.0, 1e6, 5e7, 5e8, 5e9]
+    datas = ["2025-08-20", "2025-09-01", "2025-11-30"]
+    cenarios = simular_cenarios(base, lucros, datas, compensar)
+    assert len(cenarios) == len(lucros) * len(datas)
+    for linha in cenarios.itertuples():
+        base_calc, resumo = calcular_antecipacao(base, linha.Lucro_Liquido, linha.Data_Assinatura, compensar)
+        assert linha.N_Elegiveis == resumo["n_elegiveis"]
+        assert linha.Fator_Cap == pytest.approx(resumo["fator_cap"], rel=1e-12)
+        assert linha.Total_Basica_Final == pytest.approx(base_calc["Basica_Final"].sum(), rel=1e-9, abs=1e-6)
+        assert linha.Total_Adicional_Final == pytest.approx(base_calc["Adicional_Final"].sum(), rel=1e-9, abs=1e-6)
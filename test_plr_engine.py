@@ -0,0 +1,147 @@
+# test_plr_engine.py – paridade das regras vetorizadas com as fórmulas de referência
+# Rodar: python -m pytest -q
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark_plr import gerar_base_sintetica
+from plr_engine import (
+    COD_SEM_DADOS,
+    calcular_proporcionalidade_especial, calcular_elegibilidade, compactar_base, motivos_elegibilidade,
+    aplicar_elegibilidade, com_motivo_texto, paginar, distribuir_com_tetos, calcular_antecipacao,
+)
+
+DATAS_ASSINATURA = ["2025-08-01", "2025-08-02", "2025-09-01", "2025-09-15 14:30", "2025-12-31", "2026-03-01"]
+
+MOTIVOS = ["nenhum", "doença", "Doença ", " DOENÇA", "acidente", "licença-maternidade",
+           "licenca-maternidade", " Licenca-Maternidade ", "outro", "", None]
+
+def _datas(rng, ancoras, n, espalhamento_dias, com_hora):
+    """Datas em torno das âncoras; parte delas com hora do dia (não só meia-noite)."""
+    base = pd.to_datetime(rng.choice(ancoras, n)).to_numpy()
+    datas = base + rng.integers(-espalhamento_dias, espalhamento_dias + 1, n).astype("timedelta64[D]")
+    horas = rng.integers(0, 24 * 60, n).astype("timedelta64[m]")
+    return np.where(rng.random(n) < com_hora, datas + horas, datas)
+
+def base_sintetica(n: int, semente: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(semente)
+    admissao = _datas(rng, ["2004-06-01", "2024-12-31", "2025-01-15", "2025-03-15", "2025-06-15",
+                            "2025-09-15", "2025-12-15"], n, 20, 0.3)
+    admissao = np.where(rng.random(n) < 0.05, np.datetime64("NaT"), admissao)
+    desligamento = _datas(rng, ["2025-05-15", "2025-08-02", "2025-09-01", "2025-09-15", "2025-12-31"], n, 20, 0.3)
+    desligamento = np.where(rng.random(n) < 0.4, np.datetime64("NaT"), desligamento)
+    return pd.DataFrame({
+        "Matricula": [f"M{i}" for i in range(n)],
+        "Data_Admissao": pd.to_datetime(admissao),
+        "Data_Desligamento": pd.to_datetime(desligamento),
+        "Motivo_Afastamento": rng.choice(np.array(MOTIVOS, dtype=object), n),
+    })
+
+# Bordas do mês de admissão: dia 15 conta, dia 16 não; fevereiro tem menos de 15 dias após o dia 15;
+# admissão e desligamento no mesmo mês, com o desligamento no último dia e com hora
+BORDAS = pd.DataFrame({
+    "Data_Admissao": pd.to_datetime([
+        "2025-03-15", "2025-03-16", "2025-03-15 23:59", "2025-03-14 08:00", "2025-02-15", "2025-02-14",
+        "2025-04-16", "2025-12-15", "2025-12-16", "2025-01-01", "2024-12-31 18:00", None,
+        "2026-02-14 05:00", "2026-02-14",
+    ], format="ISO8601"),
+    "Data_Desligamento": pd.to_datetime([
+        None, None, None, None, None, None,
+        "2025-08-15", None, None, "2025-08-02", "2025-08-20", None,
+        "2026-02-28 10:00", "2026-02-28 10:00",
+    ], format="ISO8601"),
+    "Motivo_Afastamento": ["nenhum", "nenhum", "nenhum", "nenhum", "nenhum", "nenhum",
+                           "nenhum", "nenhum", "nenhum", "nenhum", "licenca-maternidade", "doença",
+                           "nenhum", "nenhum"],
+})
+
+def _linha_a_linha(df: pd.DataFrame, data_assinatura) -> pd.DataFrame:
+    r = df.apply(lambda row: calcular_proporcionalidade_especial(row, data_assinatura), axis=1, result_type="expand")
+    return r.set_axis(["Proporcionalidade", "Motivo_Elegibilidade", "Meses_Contabilizados"], axis=1)
+
+def _conferir(df: pd.DataFrame, data_assinatura) -> None:
+    esperado = _linha_a_linha(df, data_assinatura)
+    obtido = calcular_elegibilidade(df, data_assinatura)
+    np.testing.assert_array_equal(obtido["Proporcionalidade"].to_numpy(), esperado["Proporcionalidade"].to_numpy())
+    np.testing.assert_array_equal(obtido["Meses_Contabilizados"].to_numpy(),
+                                  esperado["Meses_Contabilizados"].to_numpy().astype(np.int8))
+    textos = motivos_elegibilidade(obtido["Codigo_Elegibilidade"], obtido["Meses_Contabilizados"])
+    assert list(textos.astype(str)) == list(esperado["Motivo_Elegibilidade"])
+
+@pytest.mark.parametrize("data_assinatura", DATAS_ASSINATURA)
+def test_elegibilidade_igual_a_linha_a_linha(data_assinatura):
+    _conferir(base_sintetica(3000), data_assinatura)
+
+@pytest.mark.parametrize("data_assinatura", DATAS_ASSINATURA)
+def test_elegibilidade_com_motivo_categorico(data_assinatura):
+    df = base_sintetica(1000, semente=11)
+    esperado = calcular_elegibilidade(df, data_assinatura)
+    obtido = calcular_elegibilidade(compactar_base(df), data_assinatura)
+    pd.testing.assert_frame_equal(obtido, esperado)
+
+@pytest.mark.parametrize("data_assinatura", DATAS_ASSINATURA)
+def test_elegibilidade_bordas_do_mes_de_admissao(data_assinatura):
+    _conferir(BORDAS, data_assinatura)
+
+def test_elegibilidade_datas_em_texto():
+    df = base_sintetica(500, semente=3)
+    texto = df.assign(Data_Admissao=df["Data_Admissao"].dt.strftime("%Y-%m-%d"),
+                      Data_Desligamento=df["Data_Desligamento"].dt.strftime("%Y-%m-%d").fillna(""))
+    _conferir(texto, "2025-09-01")
+    assert (calcular_elegibilidade(texto, "2025-09-01")["Codigo_Elegibilidade"] == COD_SEM_DADOS).any()
+
+@pytest.mark.parametrize("crescente", [True, False])
+def test_ordenar_por_motivo_segue_o_texto(crescente):
+    base = aplicar_elegibilidade(base_sintetica(2000, semente=5), "2025-09-01")
+    pagina, n = paginar(base, {}, "Motivo_Elegibilidade", crescente, tamanho_pagina=len(base))
+    textos = com_motivo_texto(pagina)["Motivo_Elegibilidade"].astype(str)
+    esperado = com_motivo_texto(base)["Motivo_Elegibilidade"].astype(str)
+    assert n == len(base)
+    assert list(textos) == sorted(esperado, reverse=not crescente)
+    # Empates (mesmo texto) mantêm a ordem original das linhas
+    pos = pd.Series(base.index.get_indexer(pagina.index))
+    assert pos.groupby(textos.to_numpy()).is_monotonic_increasing.all()
+
+def _distribuir_repassando(total, pesos, tetos):
+    """Referência: reparte, corta nos tetos e repassa o excedente até estabilizar."""
+    pesos, tetos = np.asarray(pesos, float), np.clip(np.asarray(tetos, float), 0.0, None)
+    valores = np.zeros(len(pesos))
+    resto = float(total)
+    while resto > 1e-9:
+        livre = (pesos > 0) & (valores < tetos)
+        if not livre.any():
+            break
+        valores[livre] += resto * pesos[livre] / pesos[livre].sum()
+        resto = float(np.clip(valores - tetos, 0.0, None).sum())
+        valores = np.minimum(valores, tetos)
+    return valores, max(resto, 0.0)
+
+@pytest.mark.parametrize("fracao", [0.0, 0.1, 0.5, 0.9, 0.999, 1.0, 1.5])
+def test_distribuir_com_tetos_igual_ao_repasse(fracao):
+    rng = np.random.default_rng(8)
+    n = 2000
+    pesos = np.where(rng.random(n) < 0.05, 0.0, rng.uniform(100, 20000, n))
+    tetos = pesos * rng.choice([0.5, 1.0, 1.0, 2.0], n)            # limiares repetidos (empates)
+    tetos[rng.random(n) < 0.03] = 0.0
+    total = fracao * tetos[pesos > 0].sum()
+    valores, sobra = distribuir_com_tetos(total, pesos, tetos)
+    esperado, sobra_esperada = _distribuir_repassando(total, pesos, tetos)
+    np.testing.assert_allclose(valores, esperado, rtol=1e-9, atol=1e-6)
+    assert sobra == pytest.approx(sobra_esperada, abs=1e-6)
+    assert (valores <= tetos + 1e-9).all() and (valores[pesos <= 0] == 0).all()
+    assert valores.sum() + sobra == pytest.approx(total, rel=1e-12, abs=1e-6)
+
+@pytest.mark.parametrize("lucro", [1e6, 5e7, 5e8, 5e10])
+def test_redistribuir_so_muda_a_basica_quando_o_teto_global_limita(lucro):
+    base = gerar_base_sintetica(3000, semente=6)
+    fixo, resumo = calcular_antecipacao(base, lucro, "2025-09-01", False)
+    redist, resumo_redist = calcular_antecipacao(base, lucro, "2025-09-01", False, redistribuir=True)
+    # Adicional: teto proporcional ao rateio, nada a repassar
+    np.testing.assert_array_equal(redist["Adicional_Final"].to_numpy(), fixo["Adicional_Final"].to_numpy())
+    assert resumo_redist["sobra_adicional"] == resumo["sobra_adicional"]
+    if resumo["fator_cap"] < 1.0:
+        assert redist["Basica_Final"].sum() == pytest.approx(resumo["limite_global_basica"], rel=1e-9)
+        assert (redist["Basica_Final"] <= redist["Basica_Indiv_Cap"] + 1e-9).all()
+    else:
+        np.testing.assert_array_equal(redist["Basica_Final"].to_numpy(), fixo["Basica_Final"].to_numpy())
@@ -0,0 +1,88 @@
+# test_plr_incremental.py – apuração incremental (por delta do cadastro) igual à apuração completa
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark_plr import gerar_base_sintetica
+from plr_engine import calcular_antecipacao
+from plr_incremental import ApuracaoIncremental
+from plr_store import BaseManual
+
+ASSINATURA = "2025-09-01"
+COLUNAS_NUMERICAS = ["Proporcionalidade", "Meses_Contabilizados", "Codigo_Elegibilidade", "Base_PLR_Basica",
+                     "Basica_Indiv_Cap", "Basica_Final", "Adicional_Final", "PLR_Antecipacao_Total"]
+
+@pytest.fixture
+def cadastro(tmp_path):
+    base_manual = BaseManual(str(tmp_path / "cadastro.sqlite"))
+    base_manual.upsert(gerar_base_sintetica(2000, semente=5))
+    return base_manual
+
+def _conferir(apuracao, base_manual, lucro=5e8, compensar=True, data=ASSINATURA):
+    apuracao.sincronizar(base_manual, data)
+    obtido, resumo = apuracao.resultado(lucro, compensar)
+    esperado, resumo_completo = calcular_antecipacao(base_manual.carregar(), lucro, data, compensar)
+
+    assert list(obtido.columns) == list(esperado.columns)
+    obtido = obtido.set_index("Matricula").loc[esperado["Matricula"]]
+    for c in COLUNAS_NUMERICAS:
+        np.testing.assert_allclose(obtido[c].to_numpy(float), esperado[c].to_numpy(float), rtol=1e-9, atol=1e-6)
+    assert (obtido["Elegivel"].astype(str).to_numpy() == esperado["Elegivel"].astype(str).to_numpy()).all()
+
+    # Somas mantidas por delta = fórmula direta sobre a base inteira
+    elegiveis = esperado["Proporcionalidade"] > 0
+    assert resumo["n_elegiveis"] == resumo_completo["n_elegiveis"] == int(elegiveis.sum())
+    assert apuracao.soma_props == pytest.approx(esperado.loc[elegiveis, "Proporcionalidade"].sum(), rel=1e-12)
+    assert apuracao.total_basica_pre_cap == pytest.approx(esperado.loc[elegiveis, "Basica_Indiv_Cap"].sum(), rel=1e-12)
+    assert resumo["fator_cap"] == pytest.approx(resumo_completo["fator_cap"], rel=1e-9)
+
+def test_edicoes_reavaliam_so_as_matriculas_mudadas(cadastro):
+    apuracao = ApuracaoIncremental()
+    _conferir(apuracao, cadastro)
+
+    cadastro.upsert(pd.DataFrame({"Matricula": ["M10"], "Nome": ["Alterada"], "Cargo": ["Cargo Novo"],
+                                  "Salario": [99999.0], "Data_Admissao": [pd.Timestamp("2025-03-10")]}))
+    assert apuracao.sincronizar(cadastro, ASSINATURA) == {"novas": 0, "alteradas": 1, "removidas": 0}
+    _conferir(apuracao, cadastro)
+
+    cadastro.remover(["M3", "M4", "nao-existe"])
+    assert apuracao.sincronizar(cadastro, ASSINATURA) == {"novas": 0, "alteradas": 0, "removidas": 2}
+    _conferir(apuracao, cadastro)
+
+    cadastro.upsert(gerar_base_sintetica(3, semente=9).assign(Matricula=["Z1", "Z2", "M5"]))
+    assert apuracao.sincronizar(cadastro, ASSINATURA) == {"novas": 2, "alteradas": 1, "removidas": 0}
+    _conferir(apuracao, cadastro)
+    _conferir(apuracao, cadastro, lucro=0.0, compensar=False)
+
+def test_nova_data_de_assinatura_e_cadastro_apagado_recarregam(cadastro):
+    apuracao = ApuracaoIncremental()
+    _conferir(apuracao, cadastro)
+    _conferir(apuracao, cadastro, data="2025-08-20")
+    cadastro.limpar()
+    cadastro.upsert(gerar_base_sintetica(50, semente=1))
+    assert apuracao.sincronizar(cadastro, ASSINATURA)["novas"] == 50
+    _conferir(apuracao, cadastro)
+
+def test_cadastro_vazio_e_primeiras_inclusoes(tmp_path):
+    cadastro = BaseManual(str(tmp_path / "vazio.sqlite"))
+    apuracao = ApuracaoIncremental()
+    apuracao.sincronizar(cadastro, ASSINATURA)
+    assert apuracao.base().empty
+    cadastro.upsert(gerar_base_sintetica(20, semente=2))
+    _conferir(apuracao, cadastro)
+
+def test_impressao_e_a_da_versao_sincronizada(cadastro):
+    apuracao = ApuracaoIncremental()
+    apuracao.sincronizar(cadastro, ASSINATURA)
+    assert apuracao.impressao == cadastro.impressao()
+    # Remover nada não cria versão nova (não invalida caches nem a apuração)
+    assert cadastro.remover([]) == 0
+    assert apuracao.impressao == cadastro.impressao()
+    assert apuracao.sincronizar(cadastro, ASSINATURA) == {"novas": 0, "alteradas": 0, "removidas": 0}
+
+    linhas, mudadas, impressao = cadastro.ler_desde(apuracao.impressao)
+    assert (linhas, mudadas, impressao) == (None, set(), apuracao.impressao)
+    cadastro.remover(["M1"])
+    linhas, mudadas, impressao = cadastro.ler_desde(apuracao.impressao)
+    assert linhas.empty and mudadas == {"M1"} and impressao == cadastro.impressao() != apuracao.impressao
@@ -0,0 +1,44 @@
+# test_plr_io.py – leitura em blocos: o resultado não depende do tamanho do bloco
+# Rodar: python -m pytest -q
+
+from io import StringIO
+
+import pandas as pd
+import pytest
+
+from benchmark_plr import gerar_base_sintetica
+from plr_io import ler_csv_em_blocos
+
+def _csv_dia_mes(n: int = 150) -> str:
+    """Base como num export de RH brasileiro: datas DD/MM/AAAA, a maioria ambígua (dia <= 12)."""
+    base = gerar_base_sintetica(n, semente=3)
+    for c in ["Data_Admissao", "Data_Desligamento"]:
+        base[c] = pd.to_datetime(base[c]).dt.strftime("%d/%m/%Y")
+    return base.to_csv(index=False)
+
+@pytest.mark.parametrize("texto", [
+    "Matricula,Data_Admissao,Data_Desligamento\n1,13/01/2020,\n2,05/03/2025,\n3,20/03/2025,01/09/2025\n",
+    _csv_dia_mes(),
+    gerar_base_sintetica(150, semente=4).to_csv(index=False),
+], ids=["exemplo", "dia_mes", "iso"])
+def test_mesmo_resultado_com_qualquer_tamanho_de_bloco(texto):
+    inteira, relatorio = ler_csv_em_blocos(StringIO(texto), linhas_por_bloco=10_000)
+    assert relatorio["Data_Admissao_invalida"] == relatorio["Data_Desligamento_invalida"] == 0
+    for linhas_por_bloco in [1, 2, 7, 100]:
+        em_blocos, _ = ler_csv_em_blocos(StringIO(texto), linhas_por_bloco=linhas_por_bloco)
+        # Categorias podem vir em outra ordem (união bloco a bloco); os valores não mudam
+        pd.testing.assert_frame_equal(em_blocos, inteira, check_categorical=False)
+
+def test_datas_dia_mes():
+    texto = "Matricula,Data_Admissao,Data_Desligamento\n1,13/01/2020,\n2,05/03/2025,\n3,20/03/2025,01/09/2025\n"
+    base, relatorio = ler_csv_em_blocos(StringIO(texto), linhas_por_bloco=1)
+    assert relatorio["formatos_data"] == {"Data_Admissao": "%d/%m/%Y", "Data_Desligamento": "%d/%m/%Y"}
+    assert list(base["Data_Admissao"]) == list(pd.to_datetime(["2020-01-13", "2025-03-05", "2025-03-20"]))
+    assert base["Data_Desligamento"].iloc[2] == pd.Timestamp("2025-09-01")
+
+def test_formato_informado_vale_para_todos_os_blocos():
+    texto = "Matricula,Data_Admissao\n1,05/03/2025\n2,13/01/2020\n"
+    base, relatorio = ler_csv_em_blocos(StringIO(texto), linhas_por_bloco=1, formato_data="%m/%d/%Y")
+    assert base["Data_Admissao"].iloc[0] == pd.Timestamp("2025-05-03")
+    assert base["Data_Admissao"].isna().to_numpy().tolist() == [False, True]
+    assert relatorio["Data_Admissao_invalida"] == 1
@@ -0,0 +1,46 @@
+# test_plr_lote.py – parâmetros por entidade: em branco valem os padrões do lote
+# Rodar: python -m pytest -q
+
+from io import StringIO
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from benchmark_plr import gerar_base_sintetica
+from plr_engine import calcular_antecipacao
+from plr_lote import ler_parametros, processar_lote, salvar_lote
+
+PARAMETROS = ("Entidade,Lucro_Liquido,Data_Assinatura,Compensar\n"
+              "E1,1e6,,sim\n"
+              "E2,1e6,2025-10-01,\n"
+              "E3,1e6,,não\n")
+
+def test_compensar_em_branco_fica_na():
+    params = ler_parametros(StringIO(PARAMETROS), "parametros.csv")
+    assert str(params["Compensar"].dtype) == "boolean"
+    assert params["Compensar"].tolist() == [True, pd.NA, False]
+
+@pytest.mark.parametrize("compensar_padrao", [False, True])
+def test_processar_lote_usa_os_padroes(tmp_path, compensar_padrao):
+    base = gerar_base_sintetica(500, semente=2)
+    bases = {e: (base.to_csv(index=False).encode(), f"{e}.csv") for e in ["E1", "E2", "E3"]}
+    params = ler_parametros(StringIO(PARAMETROS), "parametros.csv")
+    resultados = processar_lote(bases, params, "2025-09-01", compensar_padrao, max_workers=1)
+
+    esperado = {"E1": ("2025-09-01", True), "E2": ("2025-10-01", compensar_padrao), "E3": ("2025-09-01", False)}
+    for r in resultados:
+        data, compensar = esperado[r["entidade"]]
+        base_calc, _ = calcular_antecipacao(base, 1e6, data, compensar)
+        outro, _ = calcular_antecipacao(base, 1e6, data, not compensar)
+        total = r["base_calc"]["PLR_Antecipacao_Total"].sum()
+        assert total == pytest.approx(base_calc["PLR_Antecipacao_Total"].sum())
+        assert total != pytest.approx(outro["PLR_Antecipacao_Total"].sum())
+
+    # Fator_Cap do Resumo com as 6 casas do app e do CLI (os valores em R$ com 2)
+    caminho = tmp_path / "lote.xlsx"
+    salvar_lote(resultados, caminho)
+    aba = openpyxl.load_workbook(caminho, read_only=True)["Resumo"]
+    linhas = list(aba.values)
+    fator = linhas[1][linhas[0].index("Fator_Cap")]
+    assert fator == round(resultados[0]["resumo"]["fator_cap"], 6) != round(fator, 2)